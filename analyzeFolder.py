@@ -13,7 +13,7 @@ inputFileDirectory is the path to the directory or folder that contains the text
 The first line of the output file will be a comma-delimited list of 24 fields (including Filename, abbreviations of the 9 structures, and abbreviations of the 14 syntactic complexity indices). The subsequent lines of the file will each provide a comma-delimited list of 24 values for one input file (including the name of the file, frequency counts of the 9 structures, and the values of the 14 syntactic complexity indices). This format may be hard to read but allows easy import to Excel or SPSS. 
 """
 
-import sys, os, subprocess, glob, re
+import sys, os, glob, re, workspace, jvmpool, l2sca
 
 #a function to divide two numbers from strings
 def division(x,y):
@@ -60,89 +60,91 @@ ft="'FRAG > ROOT !<< (S|SBARQ|SINV|SQ > ROOT | [$-- S|SBARQ|SINV|SQ !>> SBAR|VP]
 #list of patterns to search for
 patternlist=[s,vp,c,t,dc,ct,cp,cn1,cn2,cn3,fc,ft,vp_q]
 
-#location of the Stanford parser
-parserPath="stanford-parser-full-2020-11-17/lexparser.sh"
-
 #path to the directory or folder containing input files
 directoryPath=sys.argv[1]
 
-#output file name
-outputFile=open(sys.argv[2],"w")
-
-#write a list of 24 comma-delimited fields to the output file
-fields="Filename,W,S,VP,C,T,DC,CT,CP,CN,MLS,MLT,MLC,C/S,VP/T,C/T,DC/C,DC/T,T/S,CT/T,CP/T,CP/C,CN/T,CN/C"
-outputFile.write(fields+"\n")
-
-#process text files in the directory one by one
-for filename in glob.glob( os.path.join(directoryPath, '*.txt') ):
-    print('Processing '+filename+'...')
-
-    #Extract the name of the file being processed
-    output=filename.split('/')[-1]
-
-    #name a temporary file to hold the parse trees of the input file
-    parsedFile=filename+".parsed"
-
-    #parse the input file
-    command=parserPath + " " + filename + " > " + parsedFile
-    a=subprocess.getoutput(command).split('\n')[-1].split()
-
-    #list of counts of the patterns
-    patterncount=[]
-
-    #query the parse trees using the tregex patterns
-    for pattern in patternlist:
-        command = "./tregex.sh " + pattern + " " + parsedFile + " -C -o"
-        count = subprocess.getoutput(command).split('\n')[-1]
-        patterncount.append(int(count))
-
-    #update frequencies of complex nominals, clauses, and T-units
-    patterncount[7]=patterncount[-4]+patterncount[-5]+patterncount[-6]
-    patterncount[2]=patterncount[2]+patterncount[-3]
-    patterncount[3]=patterncount[3]+patterncount[-2]
-    patterncount[1]=patterncount[1]+patterncount[-1]
-        
-    #word count
-    infile=open(parsedFile,"r")
-    content=infile.read()
-    w = len(re.findall("\\([A-Z]+\\$? [^\\)\\(-]+\\)", content))
-    infile.close()
-        
-    #add frequencies of words and other structures to output string
-    output+=","+str(w) #number of words
-    for count in patterncount[:8]:
-        output+=","+str(count)
-
-    #list of frequencies of structures other than words
-    [s,vp,c,t,dc,ct,cp,cn]=patterncount[:8]
-
-    #compute the 14 syntactic complexity indices
-    mls=division(w,s)
-    mlt=division(w,t)
-    mlc=division(w,c)
-    c_s=division(c,s)
-    vp_t=division(vp,t)
-    c_t=division(c,t)
-    dc_c=division(dc,c)
-    dc_t=division(dc,t)
-    t_s=division(t,s)
-    ct_t=division(ct,t)
-    cp_t=division(cp,t)
-    cp_c=division(cp,c)
-    cn_t=division(cn,t)
-    cn_c=division(cn,c)
-
-    #add syntactic complexity indices to output string
-    for ratio in [mls,mlt,mlc,c_s,vp_t,c_t,dc_c,dc_t,t_s,ct_t,cp_t,cp_c,cn_t,cn_c]:
-        output+=","+str("%.4F" % ratio)
-
-    #write output string to output file
-    outputFile.write(output+"\n")
-
-    #delete the temporary file holding the parse trees
-    command="rm "+parsedFile
-    os.popen(command)
-
-outputFile.close()
-
-print('Done. Output was saved to ' + sys.argv[2] +'.')
+#all files share one scratch workspace and, if it is built, one warm worker
+with workspace.Workspace() as scratch, jvmpool.optional_pool(patterns=patternlist) as pool:
+
+    #output file name; the results are written in the workspace and published when complete
+    outputPath=scratch.file("output.csv")
+    outputFile=open(outputPath,"w")
+
+    #write a list of 24 comma-delimited fields to the output file
+    fields="Filename,W,S,VP,C,T,DC,CT,CP,CN,MLS,MLT,MLC,C/S,VP/T,C/T,DC/C,DC/T,T/S,CT/T,CP/T,CP/C,CN/T,CN/C"
+    outputFile.write(fields+"\n")
+
+    #process text files in the directory one by one
+    for filename in glob.glob( os.path.join(directoryPath, '*.txt') ):
+        print('Processing '+filename+'...')
+
+        #Extract the name of the file being processed
+        output=filename.split('/')[-1]
+
+        #name a temporary file to hold the parse trees of the input file
+        parsedFile=scratch.file(output+".parsed")
+
+        #parse the input file and query the parse trees using the tregex patterns, with a warm
+        #worker from the pool if there is one and with new JVMs if the worker fails
+        try:
+            l2sca.parse_file(filename, parsedFile, pool=pool)
+            trees, treecounts = l2sca.tree_pattern_counts(parsedFile, pool, patternlist)
+        except jvmpool.WorkerError as e:
+            print('Worker failed ('+str(e)+'), retrying without it...')
+            l2sca.parse_file(filename, parsedFile)
+            trees, treecounts = l2sca.tree_pattern_counts(parsedFile, None, patternlist)
+
+        #sum the counts of all trees
+        patterncount=[sum(counts) for counts in treecounts]
+
+        #update frequencies of complex nominals, clauses, and T-units
+        patterncount[7]=patterncount[-4]+patterncount[-5]+patterncount[-6]
+        patterncount[2]=patterncount[2]+patterncount[-3]
+        patterncount[3]=patterncount[3]+patterncount[-2]
+        patterncount[1]=patterncount[1]+patterncount[-1]
+
+        #word count
+        infile=open(parsedFile,"r")
+        content=infile.read()
+        w = len(re.findall("\\([A-Z]+\\$? [^\\)\\(-]+\\)", content))
+        infile.close()
+
+        #add frequencies of words and other structures to output string
+        output+=","+str(w) #number of words
+        for count in patterncount[:8]:
+            output+=","+str(count)
+
+        #list of frequencies of structures other than words
+        [s,vp,c,t,dc,ct,cp,cn]=patterncount[:8]
+
+        #compute the 14 syntactic complexity indices
+        mls=division(w,s)
+        mlt=division(w,t)
+        mlc=division(w,c)
+        c_s=division(c,s)
+        vp_t=division(vp,t)
+        c_t=division(c,t)
+        dc_c=division(dc,c)
+        dc_t=division(dc,t)
+        t_s=division(t,s)
+        ct_t=division(ct,t)
+        cp_t=division(cp,t)
+        cp_c=division(cp,c)
+        cn_t=division(cn,t)
+        cn_c=division(cn,c)
+
+        #add syntactic complexity indices to output string
+        for ratio in [mls,mlt,mlc,c_s,vp_t,c_t,dc_c,dc_t,t_s,ct_t,cp_t,cp_c,cn_t,cn_c]:
+            output+=","+str("%.4F" % ratio)
+
+        #write output string to output file
+        outputFile.write(output+"\n")
+
+        #delete the temporary file holding the parse trees
+        os.remove(parsedFile)
+
+    #publish the output file
+    outputFile.close()
+    workspace.publish(outputPath, sys.argv[2])
+
+    print('Done. Output was saved to ' + sys.argv[2] +'.')
@@ -0,0 +1,45 @@
+"""
+This script analyzes every sentence of a single plain text file in one pass.
+
+It counts the occurrences of the same 9 structures as analyzeText.py (W, S, VP, C, T, DC, CT, CP, CN), but attributes every match to the sentence it was found in. The text is parsed once and each tregex pattern is run once over the whole parse, so per-sentence detail costs the same as the document-level analysis.
+
+To run the script, type the following at the command line:
+python analyzeSentences.py inputFileName outputFileName
+
+inputFileName is either a plain text file or a file of parse trees with the .parsed suffix (such as samples/wsj_0001.parsed), in which case the parsing step is skipped. outputFileName is the name you want to assign to the output file. Both names must be provided.
+
+The output file is a sentences x 9 counts matrix in CSV format. The first line is a comma-delimited list of 10 fields (Sentence and abbreviations of the 9 structures). Each following line holds the 1-based index of one sentence and its 9 counts.
+"""
+
+import sys, csv
+
+import l2sca, workspace, jvmpool
+
+#input file name
+inputFile=sys.argv[1]
+
+#output file name
+outputName=sys.argv[2]
+print('Processing '+inputFile+'...')
+
+#parse and count in a scratch workspace, with a warm worker if one is built
+with workspace.Workspace() as scratch, jvmpool.optional_pool() as pool:
+
+    if inputFile.endswith(".parsed"):
+        matrix=l2sca.sentence_matrix(inputFile, pool)
+    else:
+        #parse the whole input file once into a file of trees in the workspace
+        parsedFile=scratch.file("input.parsed")
+        l2sca.parse_file(inputFile, parsedFile, pool=pool)
+        matrix=l2sca.sentence_matrix(parsedFile, pool)
+
+    #write one row of counts per sentence and publish the file when complete
+    outputPath=scratch.file("output.csv")
+    with open(outputPath, "w", newline="") as outputFile:
+        writer=csv.writer(outputFile)
+        writer.writerow(["Sentence"]+l2sca.structures)
+        for index, row in enumerate(matrix, start=1):
+            writer.writerow([index]+row)
+    workspace.publish(outputPath, outputName)
+
+print('Done. '+str(len(matrix))+' sentences. Output was saved to ' + outputName +'.')
@@ -0,0 +1,175 @@
+"""
+Benchmark the parser backends on the bundled samples.
+
+For each backend in parsers.py the sample texts are parsed and counted, and the
+script reports the parsing speed in sentences per second, with the JVM start and
+model load timed separately, and, for each of the 9 L2SCA counts and 14 indices,
+how far the backend drifts from the PCFG baseline (the mean absolute relative
+difference over the sample files, in percent). It also prints whether the warm
+worker or the parser command line was used.
+
+To run the script, type the following at the command line:
+python benchmarkParsers.py [--backends pcfg,factored,pcfg-short,sr] [--output results.csv] [files...]
+
+Without files, the .txt files in samples-L2SCA/ and samples/ are used. The
+baseline backend (pcfg) is always run first.
+"""
+
+import argparse
+import csv
+import glob
+import os
+import subprocess
+import sys
+import time
+
+import jvmpool
+import l2sca
+import parsers
+import workspace
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Compare the speed and L2SCA counts of the parser backends.")
+    parser.add_argument("files", nargs="*", help="Plain text files to parse (default: the bundled samples)")
+    parser.add_argument("--backends", default=",".join(parsers.backends),
+                        help="Comma-separated backends to compare (default: all)")
+    parser.add_argument("--output", help="Also write the results to this CSV file")
+    return parser.parse_args()
+
+
+def find_output(output_dir, filename):
+    """
+    Return the .parsed file the parser wrote to output_dir for filename.
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    for candidate in (os.path.basename(filename) + ".parsed", stem + ".parsed"):
+        if os.path.exists(os.path.join(output_dir, candidate)):
+            return os.path.join(output_dir, candidate)
+    raise ValueError(f"the parser wrote no output for {filename}")
+
+
+def run_backend(backend, files):
+    """
+    Parse and count every file with backend.
+
+    Returns the mode ("worker" or "command line"), the number of sentences, the seconds
+    spent starting the JVM and loading the model, the seconds spent parsing, and the 23
+    measures of each file. The JVM start and model load are timed on their own, so the
+    parsing speed compares the backends and not their start-up costs:
+    - with the worker, by starting it with a PING before the files are parsed one by one;
+    - without it, by a run on a one-sentence file, whose time is subtracted from one
+      run that parses all the files.
+    """
+    stems = [os.path.splitext(os.path.basename(filename))[0] for filename in files]
+    if len(set(stems)) != len(stems):
+        raise ValueError("the input files must have different names")
+
+    sentences = 0
+    seconds = 0.0
+    measures = {}
+    with workspace.Workspace(prefix="benchmark-") as scratch, jvmpool.optional_pool(backend=backend) as pool:
+        start = time.perf_counter()
+        if pool is not None:
+            mode = "worker"
+            pool.request("PING")
+            load_seconds = time.perf_counter() - start
+            parsed_files = {}
+            for filename in files:
+                parsed_files[filename] = scratch.file(os.path.basename(filename) + ".parsed")
+                start = time.perf_counter()
+                l2sca.parse_file(filename, parsed_files[filename], pool=pool, backend=backend)
+                seconds += time.perf_counter() - start
+        else:
+            mode = "command line"
+            warmup_file = scratch.file("warmup.txt")
+            with open(warmup_file, 'w', encoding='utf-8') as outfile:
+                outfile.write("This is a test.\n")
+            subprocess.run(backend.command(warmup_file), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            load_seconds = time.perf_counter() - start
+
+            output_dir = scratch.file("parsed")
+            os.makedirs(output_dir)
+            start = time.perf_counter()
+            subprocess.run(backend.command(files, output_dir=output_dir), stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, check=True)
+            seconds = max(0.0, time.perf_counter() - start - load_seconds)
+            parsed_files = {filename: find_output(output_dir, filename) for filename in files}
+
+        for filename in files:
+            matrix = l2sca.sentence_matrix(parsed_files[filename], pool)
+            totals = l2sca.matrix_totals(matrix)
+            sentences += len(matrix)
+            measures[filename] = totals + l2sca.compute_indices(totals)
+    return mode, sentences, load_seconds, seconds, measures
+
+
+def drift(measures, baseline):
+    """
+    Mean absolute relative difference, in percent, of each of the 23 measures from the baseline.
+    """
+    result = []
+    for i in range(len(l2sca.structures) + len(l2sca.indices)):
+        differences = []
+        for filename, values in measures.items():
+            expected = baseline[filename][i]
+            if expected:
+                differences.append(abs(values[i] - expected) / abs(expected) * 100)
+            elif values[i]:
+                differences.append(100.0)
+            else:
+                differences.append(0.0)
+        result.append(sum(differences) / len(differences) if differences else 0.0)
+    return result
+
+
+def main():
+    args = parse_arguments()
+    files = args.files or sorted(glob.glob("samples-L2SCA/*.txt") + glob.glob("samples/*.txt"))
+    if not files:
+        print("No input files found.")
+        sys.exit(1)
+
+    names = [name.strip() for name in args.backends.split(",") if name.strip()]
+    names = [parsers.defaultBackend] + [name for name in names if name != parsers.defaultBackend]
+
+    header = ["Backend", "Mode", "Load seconds", "Sentences", "Seconds", "Sentences/sec"] + ["drift " + name + " (%)" for name in l2sca.structures + l2sca.indices]
+    rows = []
+    baseline = None
+    for name in names:
+        try:
+            backend = parsers.get_backend(name)
+            print(f"Parsing {len(files)} files with {name}: {backend.description}")
+            mode, sentences, load_seconds, seconds, measures = run_backend(backend, files)
+            print(f"  {mode}: JVM start and model load {load_seconds:.2f} s, parsing {seconds:.2f} s")
+        except Exception as e:
+            print(f"  {name} failed: {e}")
+            if baseline is None:
+                print("The baseline backend must succeed to compute drift.")
+                sys.exit(1)
+            continue
+        if baseline is None:
+            baseline = measures
+        speed = sentences / seconds if seconds else 0.0
+        rows.append([name, mode, "%.2F" % load_seconds, sentences, "%.2F" % seconds, "%.2F" % speed] +
+                    ["%.2F" % value for value in drift(measures, baseline)])
+
+    # Print the speed of each backend and its largest drifts
+    print()
+    print(f"{'Backend':<12}{'Mode':<14}{'Load s':>8}{'Sentences':>10}{'Seconds':>10}{'Sent/sec':>10}"
+          f"  Largest drift from {parsers.defaultBackend}")
+    for row in rows:
+        drifts = sorted(zip(row[6:], l2sca.structures + l2sca.indices), key=lambda item: -float(item[0]))[:4]
+        summary = ", ".join(f"{measure} {value}%" for value, measure in drifts)
+        print(f"{row[0]:<12}{row[1]:<14}{row[2]:>8}{row[3]:>10}{row[4]:>10}{row[5]:>10}  {summary}")
+
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as outfile:
+            writer = csv.writer(outfile)
+            writer.writerow(header)
+            writer.writerows(rows)
+        print("Results saved to", args.output)
+
+
+if __name__ == "__main__":
+    main()
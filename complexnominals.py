@@ -4,6 +4,8 @@ from nltk.parse.stanford import StanfordParser
 import argparse
 import csv
 
+import jvmpool
+
 # Set the path to the Stanford Parser directory
 stanford_parser_dir = 'stanford-parser-full-2020-11-17'
 os.environ['STANFORD_PARSER'] = os.path.join(stanford_parser_dir, 'stanford-parser.jar')
@@ -43,7 +45,12 @@ def main():
 
     # Parse the text
     sentences = nltk.sent_tokenize(text)
-    parse_trees = parser.raw_parse_sents(sentences)
+    if jvmpool.available():
+        # Parse with a warm worker instead of a new JVM started by the NLTK wrapper
+        with jvmpool.WorkerPool(patterns=[]) as pool:
+            parse_trees = [[nltk.Tree.fromstring(tree)] for tree in pool.parse(sentences)]
+    else:
+        parse_trees = parser.raw_parse_sents(sentences)
 
     # Extract complex nominals
     complex_nominals = []
@@ -0,0 +1,383 @@
+"""
+An indexed on-disk corpus of parse trees.
+
+A .parsed file is plain bracketed text: reaching sentence N means reading and
+splitting everything before it, and the files are removed after each run. A
+corpus keeps the trees of many documents in one directory, together with an
+index that finds any sentence without reading the others:
+
+    corpus.json      format version, number of index records, document metadata
+    trees.bin        every tree as one line of PTB text, compressed on its own with zlib
+    index.bin        one fixed-width record per tree: document id, sentence number,
+                     offset and length of the compressed tree in trees.bin
+
+Both .bin files are memory-mapped for reading. Sentences are numbered from 1,
+like Tregex tree numbers. Documents are only ever appended, and corpus.json is
+replaced atomically after the trees and index records are written, so a reader
+never sees a half-imported document. Appends hold a lock on corpus.lock, so
+several imports into the same corpus can run at once.
+
+To run the script, type one of the following at the command line:
+python corpus.py import corpus_dir file.parsed [file.txt ...] [--name NAME] [--meta key=value ...]
+python corpus.py export corpus_dir [document ...] [--output file.parsed]
+python corpus.py list corpus_dir
+python corpus.py show corpus_dir document sentence
+
+Plain .txt files are parsed first (with the worker pool when it has been built).
+"""
+
+import argparse
+import contextlib
+import json
+import mmap
+import os
+import struct
+import subprocess
+import sys
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no flock; msvcrt.locking gives the same exclusive lock
+    fcntl = None
+    import msvcrt
+
+import jvmpool
+import l2sca
+import parsers
+import workspace
+
+formatVersion=1
+
+#document id, sentence number, offset and length of the compressed tree
+recordFormat=struct.Struct("<IIQI")
+
+#preset zlib dictionary of common Penn Treebank fragments; changing it needs a new formatVersion
+treeDictionary=(b"(-LRB- -LRB-) (-RRB- -RRB-) (`` ``) ('' '') (: :) (, ,) (. .) (SBAR (IN that) (S "
+                b"(ADVP (RB (ADJP (JJ (PP (IN of) (PP (IN in) (PP (TO to) (VP (TO to) (VP (VB (VP (VBD "
+                b"(VP (VBZ (VP (VBP (VP (VBG (VP (VBN (VP (MD (NP (PRP (NP (NNP (NP (NNS (NP (DT the) "
+                b"(NP (DT a) (NN (CC and) (PRP$ (NP (NP (DT (S (NP (ROOT (S (NP ")
+
+
+def compress_tree(tree):
+    compressor = zlib.compressobj(9, zdict=treeDictionary)
+    return compressor.compress(" ".join(tree.split()).encode('utf-8')) + compressor.flush()
+
+
+def decompress_tree(data):
+    decompressor = zlib.decompressobj(zdict=treeDictionary)
+    return (decompressor.decompress(data) + decompressor.flush()).decode('utf-8')
+
+
+def read_parsed_file(parsed_file):
+    """
+    Return the parse trees of a .parsed file as one-line PTB strings, without typed dependencies.
+    """
+    with open(parsed_file, 'r', encoding='utf-8') as infile:
+        return [" ".join(tree.split()) for tree in l2sca.split_trees(infile.read()) if l2sca.is_parse_tree(tree)]
+
+
+class CorpusError(Exception):
+    """
+    Raised for a missing or damaged corpus, or an unknown document or sentence.
+    """
+
+
+class Corpus:
+    """
+    A corpus directory opened for reading ("r") or for reading and appending ("a").
+
+    Documents are found by id or by name; each document is a dict of metadata with at
+    least "id", "name", "first" (its first index record) and "sentences".
+    """
+
+    def __init__(self, path, mode="r"):
+        if mode not in ("r", "a"):
+            raise ValueError("mode must be 'r' or 'a'")
+        self.path = path
+        self.mode = mode
+        self._trees = None
+        self._index = None
+
+        if mode == "a":
+            os.makedirs(path, exist_ok=True)
+            with self._lock():
+                for name in ("trees.bin", "index.bin"):
+                    open(os.path.join(path, name), 'ab').close()
+                if not os.path.exists(self._file("corpus.json")):
+                    self._write_header({"version": formatVersion, "records": 0, "documents": []})
+        self._read_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def __len__(self):
+        return len(self.documents)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    @contextlib.contextmanager
+    def _lock(self):
+        """
+        Hold an exclusive lock on the corpus, so that appends from several processes do not mix.
+        """
+        with open(self._file("corpus.lock"), 'a+b') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _read_header(self):
+        try:
+            with open(self._file("corpus.json"), 'r', encoding='utf-8') as infile:
+                header = json.load(infile)
+        except (OSError, ValueError) as e:
+            raise CorpusError(f"{self.path} is not a corpus: {e}")
+        if header.get("version") != formatVersion:
+            raise CorpusError(f"{self.path} has corpus format {header.get('version')}, expected {formatVersion}")
+        self.records = header["records"]
+        self.documents = header["documents"]
+        self._names = {document["name"]: document for document in self.documents}
+
+    def _write_header(self, header):
+        temporary = self._file(f"corpus.json.{os.getpid()}.tmp")
+        with open(temporary, 'w', encoding='utf-8') as outfile:
+            json.dump(header, outfile, ensure_ascii=False, indent=1)
+        os.replace(temporary, self._file("corpus.json"))
+
+    def _map(self, name):
+        with open(self._file(name), 'rb') as infile:
+            if os.fstat(infile.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _unmap(self):
+        for mapped in (self._trees, self._index):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        self._trees = None
+        self._index = None
+
+    def close(self):
+        self._unmap()
+
+    def document(self, key):
+        """
+        Return the metadata of the document with id or name key.
+        """
+        if not isinstance(key, int) and key in self._names:
+            return self._names[key]
+        if isinstance(key, int) or key.isdigit():
+            if 0 <= int(key) < len(self.documents):
+                return self.documents[int(key)]
+        raise CorpusError(f"no document {key!r} in {self.path}")
+
+    @property
+    def sentence_count(self):
+        return self.records
+
+    def record(self, number):
+        """
+        Return the (document id, sentence, offset, length) of index record number.
+        """
+        if self._index is None:
+            self._index = self._map("index.bin")
+            self._trees = self._map("trees.bin")
+        if not 0 <= number < self.records:
+            raise CorpusError(f"index record {number} is out of range")
+        return recordFormat.unpack_from(self._index, number * recordFormat.size)
+
+    def tree(self, key, sentence):
+        """
+        Return sentence (numbered from 1) of document key as a one-line PTB tree.
+        """
+        document = self.document(key)
+        if not 1 <= sentence <= document["sentences"]:
+            raise CorpusError(f"{document['name']} has no sentence {sentence}")
+        doc_id, number, offset, length = self.record(document["first"] + sentence - 1)
+        if (doc_id, number) != (document["id"], sentence):
+            raise CorpusError(f"the index of {self.path} is damaged at {document['name']} sentence {sentence}")
+        return decompress_tree(self._trees[offset:offset + length])
+
+    def trees(self, key):
+        """
+        Yield the trees of document key in order.
+        """
+        document = self.document(key)
+        for sentence in range(1, document["sentences"] + 1):
+            yield self.tree(document["id"], sentence)
+
+    def add_document(self, name, trees, metadata=None):
+        """
+        Append a document and its trees, and return its metadata.
+
+        The corpus is locked for the whole append, and documents added by other processes
+        since it was opened are read first, so concurrent imports never overwrite each other.
+        """
+        if self.mode != "a":
+            raise CorpusError(f"{self.path} was opened read-only")
+        with self._lock():
+            self._read_header()
+            if name in self._names:
+                raise CorpusError(f"{self.path} already has a document called {name!r}")
+            return self._append(name, trees, metadata)
+
+    def _append(self, name, trees, metadata):
+        document = dict(metadata or {})
+        document.update({"id": len(self.documents), "name": name, "first": self.records,
+                         "sentences": len(trees), "words": sum(l2sca.count_words(tree) for tree in trees)})
+        self._unmap()
+        with open(self._file("trees.bin"), 'r+b') as tree_file, open(self._file("index.bin"), 'r+b') as index_file:
+            # Drop anything past the last committed record, e.g. from an interrupted import; the
+            # trees end where the tree of the last committed record ends
+            index_file.truncate(self.records * recordFormat.size)
+            offset = 0
+            if self.records:
+                index_file.seek((self.records - 1) * recordFormat.size)
+                _, _, last_offset, last_length = recordFormat.unpack(index_file.read(recordFormat.size))
+                offset = last_offset + last_length
+            index_file.seek(0, os.SEEK_END)
+            tree_file.truncate(offset)
+            tree_file.seek(offset)
+            for sentence, tree in enumerate(trees, start=1):
+                data = compress_tree(tree)
+                tree_file.write(data)
+                index_file.write(recordFormat.pack(document["id"], sentence, offset, len(data)))
+                offset += len(data)
+            tree_file.flush()
+            index_file.flush()
+            os.fsync(tree_file.fileno())
+            os.fsync(index_file.fileno())
+
+        self.documents.append(document)
+        self._names[name] = document
+        self.records += len(trees)
+        self._write_header({"version": formatVersion, "records": self.records, "documents": self.documents})
+        return document
+
+    def import_parsed(self, parsed_file, name=None, metadata=None):
+        """
+        Add the parse trees of a .parsed file as a document; typed dependencies are skipped.
+        """
+        name = name or os.path.splitext(os.path.basename(parsed_file))[0]
+        metadata = dict(metadata or {})
+        metadata.setdefault("source", os.path.abspath(parsed_file))
+        metadata.setdefault("imported", time.strftime("%Y-%m-%dT%H:%M:%S"))
+        return self.add_document(name, read_parsed_file(parsed_file), metadata)
+
+    def export(self, key, outfile):
+        """
+        Write document key to outfile as PTB text, one tree per line.
+        """
+        for tree in self.trees(key):
+            outfile.write(tree + "\n")
+
+
+def import_files(corpus, files, name=None, metadata=None):
+    """
+    Import .parsed files, parsing any other (plain text) files first.
+    """
+    if name and len(files) > 1:
+        raise CorpusError("--name can only be used when importing one file")
+    text_files = [filename for filename in files if not filename.endswith(".parsed")]
+    with workspace.Workspace(prefix="corpus-") as scratch, \
+         (jvmpool.optional_pool() if text_files else contextlib.nullcontext()) as pool:
+        for filename in files:
+            document_metadata = dict(metadata or {})
+            parsed_file = filename
+            if filename in text_files:
+                parsed_file = scratch.file(os.path.basename(filename) + ".parsed")
+                backend = pool.backend if pool is not None else parsers.get_backend()
+                l2sca.parse_file(filename, parsed_file, pool=pool, backend=backend)
+                document_metadata["parser"] = backend.name
+                document_metadata["source"] = os.path.abspath(filename)
+            document = corpus.import_parsed(parsed_file, name or os.path.splitext(os.path.basename(filename))[0],
+                                            document_metadata)
+            print(f"Imported {filename} as {document['name']}: {document['sentences']} sentences")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Store parse trees in an indexed corpus.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Add .parsed (or .txt) files to a corpus")
+    import_parser.add_argument("corpus")
+    import_parser.add_argument("files", nargs="+")
+    import_parser.add_argument("--name", help="Document name (default: the file name without extension)")
+    import_parser.add_argument("--meta", action="append", default=[], metavar="KEY=VALUE",
+                               help="Metadata to store with each imported document")
+
+    export_parser = commands.add_parser("export", help="Write documents back to PTB text")
+    export_parser.add_argument("corpus")
+    export_parser.add_argument("documents", nargs="*", help="Document names or ids (default: all)")
+    export_parser.add_argument("--output", help="Output file (default: standard output)")
+
+    list_parser = commands.add_parser("list", help="List the documents of a corpus")
+    list_parser.add_argument("corpus")
+
+    show_parser = commands.add_parser("show", help="Print one sentence of a document")
+    show_parser.add_argument("corpus")
+    show_parser.add_argument("document")
+    show_parser.add_argument("sentence", type=int)
+
+    args = parser.parse_args()
+    try:
+        if args.command == "import":
+            metadata = {}
+            for item in args.meta:
+                key, sep, value = item.partition("=")
+                if not sep:
+                    parser.error(f"--meta needs KEY=VALUE, not {item!r}")
+                metadata[key] = value
+            with Corpus(args.corpus, "a") as corpus:
+                import_files(corpus, args.files, args.name, metadata)
+
+        elif args.command == "export":
+            with Corpus(args.corpus) as corpus:
+                keys = args.documents or [document["id"] for document in corpus.documents]
+                if args.output:
+                    with workspace.Workspace(prefix="corpus-") as scratch:
+                        temporary = scratch.file("export.parsed")
+                        with open(temporary, 'w', encoding='utf-8') as outfile:
+                            for key in keys:
+                                corpus.export(key, outfile)
+                        workspace.publish(temporary, args.output)
+                else:
+                    for key in keys:
+                        corpus.export(key, sys.stdout)
+
+        elif args.command == "list":
+            with Corpus(args.corpus) as corpus:
+                print(f"{len(corpus)} documents, {corpus.sentence_count} sentences")
+                for document in corpus.documents:
+                    extra = {key: value for key, value in document.items()
+                             if key not in ("id", "name", "first", "sentences", "words")}
+                    print(f"{document['id']:>6}  {document['name']}  {document['sentences']} sentences, "
+                          f"{document['words']} words  {json.dumps(extra, ensure_ascii=False) if extra else ''}")
+
+        elif args.command == "show":
+            with Corpus(args.corpus) as corpus:
+                print(corpus.tree(args.document, args.sentence))
+    except (OSError, CorpusError, ValueError, subprocess.CalledProcessError, jvmpool.WorkerError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
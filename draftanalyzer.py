@@ -0,0 +1,441 @@
+"""
+Fast approximate L2SCA analysis ("draft mode") for live feedback.
+
+Instead of a full constituency parse, each sentence is tokenized and POS-tagged
+with NLTK and the 9 L2SCA structures are estimated from the tag sequence:
+finite verb groups stand for clauses, subordinators (the "after, although, as,
+because..." list printed in the report), wh-words and unmarked embedded verbs
+open dependent clauses, coordinators followed by a new subject start new
+T-units, and noun groups with adjectives, possessives, gerunds or prepositional
+phrases count as complex nominals. After the tagger has been loaded once, a
+sentence takes about a millisecond, most of it spent in the tagger.
+
+The estimates are only a screening aid. The full analysis (l2sca.py) is still
+available with --full, and --evaluate measures the error of the estimates
+against the full L2SCA counts on the bundled samples: first with the POS tags
+of the bundled parses, which needs neither NLTK data nor Java, then with the
+NLTK tagger.
+
+To run the script, type the following at the command line:
+python draftanalyzer.py textfile.txt [--full]
+python draftanalyzer.py --evaluate [--full]
+"""
+
+import argparse
+import csv
+import glob
+import os
+import re
+import sys
+import time
+
+import l2sca
+
+#subordinators listed in the sentenceanalyzer report, longest first so that "even if" wins over "if"
+subordinators = ["even if", "so that", "such that", "after", "although", "as", "because", "before", "how", "if",
+                 "since", "though", "unless", "until", "when", "whenever", "where", "whereas", "wherever", "while"]
+
+finiteTags = {"VBD", "VBZ", "VBP", "MD"}
+verbGroupTags = {"VB", "VBD", "VBG", "VBN", "VBP", "VBZ", "MD", "RB", "TO"}
+whTags = {"WDT", "WP", "WP$", "WRB"}
+subjectTags = {"PRP", "NN", "NNS", "NNP", "NNPS", "DT", "EX", "CD", "PRP$"}
+nounTags = {"NN", "NNS", "NNP", "NNPS", "PRP", "CD"}
+nounGroupTags = {"DT", "PDT", "PRP$", "JJ", "JJR", "JJS", "CD", "NN", "NNS", "NNP", "NNPS", "POS", "VBG"}
+modifierTags = {"JJ", "JJR", "JJS", "POS", "VBG"}
+coordinationTags = {"CC"}
+clauseBreaks = {";", ":"}
+
+#auxiliaries that can be inverted with their subject ("Never has the term seemed...")
+auxiliaries = {"am", "is", "are", "was", "were", "has", "have", "had", "do", "does", "did", "will", "would",
+               "shall", "should", "can", "could", "may", "might", "must"}
+
+#bundled parses of bundled samples, whose POS tags --evaluate uses to check the heuristics without
+#NLTK data or Java; samples/testsent.txt is a copy of samples-L2SCA/sample1.txt
+parsedSamples = {"samples-L2SCA/sample1.txt": "samples/testsent.parsed"}
+
+#a (TAG word) leaf of a bracketed parse tree
+leafPattern = re.compile(r"\(([^\s()]+) ([^\s()]+)\)")
+
+
+#NLTK, once load_tagger has checked that its data is installed
+nltkModule = None
+
+
+def nltk_resources(version):
+    """
+    Return the NLTK data draft mode needs; NLTK 3.9 renamed the tokenizer and tagger data.
+    """
+    major_minor = tuple(int(part) for part in re.findall(r"\d+", version)[:2])
+    if major_minor >= (3, 9):
+        return ["punkt_tab", "averaged_perceptron_tagger_eng"]
+    return ["punkt", "averaged_perceptron_tagger"]
+
+
+def load_tagger():
+    """
+    Import NLTK and check, once, that the tokenizer and tagger data are installed.
+    """
+    global nltkModule
+    if nltkModule is not None:
+        return nltkModule
+    try:
+        import nltk
+        nltk.pos_tag(nltk.word_tokenize("This is a test."))
+    except ImportError:
+        print("NLTK library is not installed. Please install it using 'pip install nltk'.")
+        sys.exit(1)
+    except LookupError:
+        print("NLTK data is missing. You can download it using the following Python commands:")
+        print("import nltk")
+        for resource in nltk_resources(nltk.__version__):
+            print(f"nltk.download('{resource}')")
+        sys.exit(1)
+    nltkModule = nltk
+    return nltk
+
+
+def tag_sentences(sentences):
+    """
+    Tokenize and POS-tag a list of sentences with NLTK.
+    """
+    nltk = load_tagger()
+    return [nltk.pos_tag(nltk.word_tokenize(sentence)) for sentence in sentences]
+
+
+def split_sentences(text):
+    """
+    Split text into sentences with the NLTK Punkt tokenizer used by sentenceanalyzer.py.
+    """
+    nltk = load_tagger()
+    return nltk.sent_tokenize(" ".join(text.split()))
+
+
+def count_words(tagged):
+    """
+    Count the tokens that l2sca.wordPattern counts as words in a parse: punctuation and any token
+    containing a hyphen, such as "well-known", are not words.
+    """
+    return sum(1 for word, tag in tagged if l2sca.wordPattern.fullmatch(f"({tag} {word})"))
+
+
+def match_subordinator(tagged, i):
+    """
+    Return the number of tokens of the subordinator starting at position i, or 0.
+    """
+    for subordinator in subordinators:
+        parts = subordinator.split()
+        if [word.lower() for word, _ in tagged[i:i + len(parts)]] == parts:
+            # "as" and "since" are only subordinators when used as conjunctions (IN), not as adverbs
+            return len(parts) if tagged[i][1] in ("IN", "WRB") or len(parts) > 1 else 0
+    return 0
+
+
+def verb_group_end(tagged, i):
+    """
+    Return the position after the verb group starting at i, e.g. "has not been running".
+
+    The group ends at a second finite verb unless the token before it is an auxiliary, so in
+    "The man who lives here is nice" the relative clause's "lives here" does not swallow the
+    main verb "is".
+    """
+    j = i + 1
+    while j < len(tagged) and tagged[j][1] in verbGroupTags and tagged[j][1] != "TO":
+        if tagged[j][1] in finiteTags and tagged[j - 1][0].lower() not in auxiliaries:
+            break
+        j += 1
+    return j
+
+
+def estimate_counts(tagged):
+    """
+    Estimate the 9 L2SCA counts W, S, VP, C, T, DC, CT, CP, CN of one POS-tagged sentence.
+    """
+    words = count_words(tagged)
+    clauses = 0
+    verb_phrases = 0
+    t_units = 0
+    dependent = 0
+    complex_units = set()
+    coordinate = 0
+    nominals = 0
+
+    pending_marker = False
+    pending_coordination = False
+    subject_since_coordination = False
+    main_found = False
+    current_unit = 0
+    initial_dependent = False
+    inverted_auxiliary = False
+    i = 0
+    while i < len(tagged):
+        word, tag = tagged[i]
+        if inverted_auxiliary and tag in ("VB", "VBN", "VBD") and not pending_marker and not pending_coordination:
+            # the main verb after an inverted auxiliary and its subject belongs to the same clause
+            inverted_auxiliary = False
+            i = verb_group_end(tagged, i)
+            continue
+        length = match_subordinator(tagged, i)
+        if length:
+            pending_marker = True
+            i += length
+            continue
+        if tag in whTags or (word.lower() == "that" and tag in ("IN", "WDT") and i > 0):
+            pending_marker = True
+            # that- and wh-clauses right after a verb are nominal clauses (complex nominals)
+            if i > 0 and tagged[i - 1][1].startswith("VB"):
+                nominals += 1
+        elif tag in coordinationTags:
+            pending_coordination = True
+            subject_since_coordination = False
+        elif tag in clauseBreaks:
+            pending_coordination = True
+            subject_since_coordination = False
+        elif tag in subjectTags:
+            subject_since_coordination = True
+
+        finite = tag in finiteTags
+        imperative = tag == "VB" and i == 0
+        if finite or imperative:
+            j = verb_group_end(tagged, i)
+            if pending_coordination and not subject_since_coordination and main_found and not pending_marker:
+                # a coordinated verb phrase without a new subject: one clause with a coordinate VP
+                coordinate += 1
+            else:
+                clauses += 1
+                verb_phrases += 1
+                if pending_marker:
+                    dependent += 1
+                    if main_found:
+                        complex_units.add(current_unit)
+                    else:
+                        initial_dependent = True
+                elif not main_found or pending_coordination:
+                    t_units += 1
+                    current_unit = t_units
+                    main_found = True
+                    if initial_dependent:
+                        complex_units.add(current_unit)
+                        initial_dependent = False
+                else:
+                    # a finite verb after the main clause without any marker: an unmarked embedded clause
+                    dependent += 1
+                    complex_units.add(current_unit)
+            inverted_auxiliary = j == i + 1 and word.lower() in auxiliaries and j < len(tagged) \
+                and tagged[j][1] in subjectTags | {"``"}
+            pending_marker = False
+            pending_coordination = False
+            subject_since_coordination = False
+            i = j
+            continue
+
+        if tag == "TO" and i + 1 < len(tagged) and tagged[i + 1][1] == "VB":
+            # an infinitival clause has a VP under S but is not a finite clause
+            verb_phrases += 1
+            if i == 0:
+                nominals += 1
+        elif tag == "VBG" and i == 0:
+            # a gerund subject is an S that counts as a complex nominal
+            verb_phrases += 1
+            nominals += 1
+        i += 1
+
+    # coordinate phrases: coordinators between words of the same kind (NP and NP, JJ or JJ, ...)
+    for k in range(1, len(tagged) - 1):
+        if tagged[k][1] in coordinationTags:
+            left = tagged[k - 1][1][:2]
+            right = tagged[k + 1][1][:2]
+            if left == right and left in ("NN", "JJ", "RB") or (left in ("NN", "JJ") and right in ("DT", "JJ", "NN", "PR")):
+                coordinate += 1
+
+    # complex nominals: maximal noun groups with a modifier or a prepositional phrase attached
+    k = 0
+    while k < len(tagged):
+        if tagged[k][1] in nounGroupTags and tagged[k][1] != "VBG":
+            start = k
+            has_noun = False
+            has_modifier = False
+            while k < len(tagged):
+                tag = tagged[k][1]
+                if tag in nounGroupTags:
+                    has_noun = has_noun or tag in nounTags
+                    has_modifier = has_modifier or (tag in modifierTags and k > start)
+                    k += 1
+                elif tag == "IN" and has_noun and not match_subordinator(tagged, k) and k + 1 < len(tagged) \
+                        and tagged[k + 1][1] in nounGroupTags:
+                    # "scores of properties": the prepositional phrase belongs to the noun phrase
+                    has_modifier = True
+                    k += 1
+                else:
+                    break
+            if has_noun and (has_modifier or tagged[start][1] in modifierTags):
+                nominals += 1
+        else:
+            k += 1
+
+    if clauses == 0:
+        # a fragment counts as one clause and one T-unit in L2SCA
+        clauses = 1
+        t_units = 1
+    if t_units == 0:
+        # no main clause was found, so the fallback T-unit holds the initial dependent clause
+        t_units = 1
+        if initial_dependent:
+            complex_units.add(t_units)
+    return [words, 1, verb_phrases, clauses, t_units, dependent, len(complex_units), coordinate, nominals]
+
+
+def sentence_matrix(sentences, tagged=None):
+    """
+    Estimate the sentences x 9 counts matrix of a list of sentences.
+    """
+    tagged = tagged if tagged is not None else tag_sentences(sentences)
+    return [estimate_counts(sentence) for sentence in tagged]
+
+
+def full_sentence_matrix(sentences):
+    """
+    Run the full parser and Tregex analysis on a list of sentences.
+    """
+    import jvmpool
+    import workspace
+    with workspace.Workspace(prefix="draft-") as scratch, jvmpool.optional_pool() as pool:
+        sentences_file = scratch.file("sentences.lines")
+        parsed_file = scratch.file("sentences.parsed")
+        with open(sentences_file, 'w', encoding='utf-8') as outfile:
+            outfile.writelines(" ".join(sentence.split()) + "\n" for sentence in sentences)
+        l2sca.parse_file(sentences_file, parsed_file, one_sentence_per_line=True, pool=pool)
+        return l2sca.sentence_matrix(parsed_file, pool)
+
+
+def read_reference(output_file):
+    """
+    Read the 9 counts of each file from an L2SCA output CSV such as samples-L2SCA/samples_output.
+    """
+    reference = {}
+    with open(output_file, 'r', encoding='utf-8', newline='') as infile:
+        reader = csv.reader(infile)
+        next(reader)
+        for row in reader:
+            reference[row[0]] = [int(value) for value in row[1:10]]
+    return reference
+
+
+def read_parse_tags(parsed_file):
+    """
+    Return the (word, tag) tokens of every parse tree in a .parsed file.
+    """
+    with open(parsed_file, 'r', encoding='utf-8') as infile:
+        groups = l2sca.split_trees(infile.read())
+    return [[(word, tag) for tag, word in leafPattern.findall(group)] for group in groups if l2sca.is_parse_tree(group)]
+
+
+def print_errors(rows):
+    """
+    Print the estimate/full counts of each file and the mean absolute error of each count.
+
+    rows holds a (filename, estimated totals, full totals) triple per file.
+    """
+    errors = {name: [] for name in l2sca.structures}
+    print(f"{'File':<28}" + "".join(f"{name:>12}" for name in l2sca.structures))
+    for filename, estimate, expected in rows:
+        print(f"{os.path.basename(filename):<28}" + "".join(f"{f'{e}/{x}':>12}" for e, x in zip(estimate, expected)))
+        for name, e, x in zip(l2sca.structures, estimate, expected):
+            errors[name].append(abs(e - x) / x * 100 if x else (0.0 if e == 0 else 100.0))
+    print("Mean absolute error of the draft estimates:")
+    print("  " + "  ".join(f"{name} {sum(values) / len(values) if values else 0.0:.1F}%" for name, values in errors.items()))
+    print()
+
+
+def evaluate(full):
+    """
+    Compare the draft estimates with the full L2SCA counts on the bundled samples.
+
+    The bundled samples-L2SCA output gives the reference counts without running the parser.
+    The estimates are made first from the POS tags of the bundled parses (parsedSamples), which
+    measures the heuristics alone, and then from the NLTK tagger. With full=True the other
+    samples are parsed too, and the per-sentence complex flag is compared.
+    """
+    reference = {}
+    bundled = read_reference("samples-L2SCA/samples_output")
+    for filename in sorted(glob.glob("samples-L2SCA/*.txt")):
+        if os.path.basename(filename) in bundled:
+            reference[filename] = (bundled[os.path.basename(filename)], None)
+
+    print("Estimates from the POS tags of the bundled parses (estimate/full):")
+    print_errors([(filename, l2sca.matrix_totals([estimate_counts(tagged) for tagged in read_parse_tags(parsed_file)]),
+                   reference[filename][0]) for filename, parsed_file in sorted(parsedSamples.items())])
+
+    load_tagger()
+    if full:
+        for filename in sorted(glob.glob("samples/*.txt")) + sorted(reference):
+            with open(filename, 'r', encoding='utf-8') as infile:
+                sentences = split_sentences(infile.read())
+            matrix = full_sentence_matrix(sentences)
+            reference[filename] = (l2sca.matrix_totals(matrix), matrix)
+
+    rows = []
+    flags = [0, 0]
+    seconds = 0.0
+    sentence_count = 0
+    for filename, (expected, full_matrix) in sorted(reference.items()):
+        with open(filename, 'r', encoding='utf-8') as infile:
+            sentences = split_sentences(infile.read())
+        start = time.perf_counter()
+        matrix = sentence_matrix(sentences)
+        seconds += time.perf_counter() - start
+        sentence_count += len(sentences)
+        rows.append((filename, l2sca.matrix_totals(matrix), expected))
+        if full_matrix is not None and len(full_matrix) == len(matrix):
+            for draft_row, full_row in zip(matrix, full_matrix):
+                flags[0] += l2sca.is_complex(draft_row) == l2sca.is_complex(full_row)
+                flags[1] += 1
+
+    print("Estimates from the NLTK tagger (estimate/full):")
+    print_errors(rows)
+    if flags[1]:
+        print(f"Complex/simple flag agreement: {flags[0]}/{flags[1]} sentences ({flags[0] / flags[1] * 100:.1F}%)")
+    if sentence_count:
+        print(f"Draft latency: {seconds / sentence_count * 1000:.2F} ms per sentence")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Estimate L2SCA counts quickly from POS tags.")
+    parser.add_argument("input_file", nargs="?", help="Path to the input text file")
+    parser.add_argument("--full", action="store_true", help="Also run the full parser-based analysis")
+    parser.add_argument("--evaluate", action="store_true", help="Measure the error of the estimates on the bundled samples")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    if args.evaluate:
+        evaluate(args.full)
+        return
+    if not args.input_file:
+        print("Usage: {} <textfile> [--full] | --evaluate [--full]".format(sys.argv[0]))
+        sys.exit(1)
+
+    with open(args.input_file, 'r', encoding='utf-8') as infile:
+        sentences = split_sentences(infile.read())
+
+    start = time.perf_counter()
+    matrix = sentence_matrix(sentences)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["Sentence", "Complex"] + l2sca.structures)
+    for index, row in enumerate(matrix, start=1):
+        writer.writerow([index, "C" if l2sca.is_complex(row) else "S"] + row)
+    totals = l2sca.matrix_totals(matrix)
+    writer.writerow(["Total", ""] + totals)
+    writer.writerow(["Indices", ""] + ["%.4F" % ratio for ratio in l2sca.compute_indices(totals)])
+    print(f"Draft analysis of {len(matrix)} sentences took {elapsed:.1F} ms.", file=sys.stderr)
+
+    if args.full:
+        full_totals = l2sca.matrix_totals(full_sentence_matrix(sentences))
+        writer.writerow(["Full", ""] + full_totals)
+        writer.writerow(["Full indices", ""] + ["%.4F" % ratio for ratio in l2sca.compute_indices(full_totals)])
+
+
+if __name__ == "__main__":
+    main()
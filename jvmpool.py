@@ -0,0 +1,347 @@
+"""
+A pool of warm JVM workers for parsing and Tregex counting.
+
+Each worker is an L2SCAWorker process (worker/L2SCAWorker.java) that loads the
+parser model and the L2SCA tregex patterns once and then answers requests over
+its stdin/stdout pipes. The pool starts workers on demand up to a fixed size,
+checks that a worker is alive (and pings it if it has been idle) before handing
+it out, kills workers that do not answer within the request timeout (which
+grows with the number of lines in the request), and
+recycles a worker after it has served a number of requests or when its heap
+after garbage collection grows past a limit.
+
+A pool lives as long as the script run that created it: the JVM start and model
+load are paid once per run, not once per file or sentence, but every new run of
+a script starts its workers again.
+
+Build the worker once with "make worker" before using the pool.
+"""
+
+import contextlib
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+
+import l2sca
+import parsers
+import workspace
+
+#location of the compiled worker class
+workerClasses="worker/classes"
+
+
+class WorkerError(Exception):
+    """
+    Raised when a worker cannot be started, fails a request or does not answer in time.
+    """
+
+
+def available():
+    """
+    Return True if java is installed and the worker has been built with "make worker".
+    """
+    return shutil.which("java") is not None and os.path.exists(os.path.join(workerClasses, "L2SCAWorker.class"))
+
+
+@contextlib.contextmanager
+def optional_pool(**options):
+    """
+    Yield a WorkerPool if the worker has been built, or None so that callers fall back to
+    starting a new JVM per step. The pool is closed when the with-block exits.
+    """
+    if not available():
+        yield None
+        return
+    pool = WorkerPool(**options)
+    try:
+        yield pool
+    finally:
+        pool.close()
+
+
+def heap_bytes(java_heap):
+    """
+    Convert a java -mx size such as "1g" or "512m" to bytes.
+    """
+    units = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+    suffix = java_heap[-1].lower()
+    if suffix in units:
+        return int(java_heap[:-1]) * units[suffix]
+    return int(java_heap)
+
+
+class Worker:
+    """
+    One L2SCAWorker process and the pipes used to talk to it.
+    """
+
+    def __init__(self, command, startup_timeout=300):
+        self.requests = 0
+        self.heap = 0
+        self.last_used = time.monotonic()
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, text=True, encoding='utf-8', bufsize=1)
+        # A reader thread turns stdout into a queue so that every read can have a deadline
+        self.lines = queue.Queue()
+        self.reader = threading.Thread(target=self._read_stdout, daemon=True)
+        self.reader.start()
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            line = self._readline(deadline)
+            if line == "READY":
+                break
+            if line.startswith("ERR "):
+                self.kill()
+                raise WorkerError(line[4:])
+
+    def _read_stdout(self):
+        for line in self.process.stdout:
+            self.lines.put(line.rstrip("\n"))
+        self.lines.put(None)
+
+    def _readline(self, deadline):
+        try:
+            line = self.lines.get(timeout=max(0, deadline - time.monotonic()))
+        except queue.Empty:
+            self.kill()
+            raise WorkerError("worker did not answer in time")
+        if line is None:
+            self.kill()
+            raise WorkerError("worker exited unexpectedly")
+        return line
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def request(self, command, lines=(), timeout=120, line_timeout=0):
+        """
+        Send one request with its input lines and return the lines of the answer.
+
+        The worker has timeout seconds plus line_timeout seconds per input line to answer.
+        """
+        lines = [" ".join(line.split()) for line in lines]
+        try:
+            self.process.stdin.write(f"{command} {len(lines)}\n")
+            for line in lines:
+                self.process.stdin.write(line + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            self.kill()
+            raise WorkerError(f"could not send request to worker: {e}")
+
+        deadline = time.monotonic() + timeout + line_timeout * len(lines)
+        header = self._readline(deadline).split()
+        if header and header[0] == "ERR":
+            raise WorkerError(" ".join(header[1:]))
+        if len(header) != 3 or header[0] != "OK":
+            self.kill()
+            raise WorkerError("unexpected answer from worker: " + " ".join(header))
+        self.requests += 1
+        self.heap = int(header[2])
+        self.last_used = time.monotonic()
+        return [self._readline(deadline) for _ in range(int(header[1]))]
+
+    def ping(self, timeout=10):
+        """
+        Check that the worker answers; returns False (and kills it) if it does not.
+        """
+        try:
+            self.request("PING", timeout=timeout)
+            return True
+        except WorkerError:
+            return False
+
+    def close(self):
+        if self.alive():
+            try:
+                self.process.stdin.write("QUIT\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        self.kill()
+
+    def kill(self):
+        if self.alive():
+            self.process.kill()
+            self.process.wait()
+
+
+class WorkerPool:
+    """
+    A bounded pool of L2SCAWorker processes sharing one parser backend and pattern set.
+
+    Workers are started lazily, so a pool that only counts trees never pays for more
+    JVMs than it uses. A worker that has been idle for ping_after seconds is pinged before
+    it is handed out again, so a hung worker is replaced instead of failing the next request.
+    A worker is replaced after max_requests requests, when its heap after garbage collection
+    exceeds max_heap_mb, when it fails a ping, or when a request times out. A request may
+    take timeout seconds plus line_timeout seconds for each sentence, tree or text line it holds.
+    parse, count and match send long lists in requests of at most chunk_size lines, so one slow
+    list does not tie up a worker for minutes and a worker can be recycled between chunks.
+    """
+
+    def __init__(self, size=1, patterns=None, backend=None, parser=True,
+                 java_heap=None, max_requests=500, max_heap_mb=None, timeout=120, line_timeout=10,
+                 chunk_size=50, ping_after=30):
+        self.size = size
+        self.ping_after = ping_after
+        self.backend = backend or parsers.get_backend()
+        java_heap = java_heap or self.backend.java_heap
+        self.max_requests = max_requests
+        # By default a worker is recycled once it uses three quarters of its maximum heap
+        self.max_heap = max_heap_mb * 1024 * 1024 if max_heap_mb else heap_bytes(java_heap) * 3 // 4
+        self.timeout = timeout
+        self.line_timeout = line_timeout
+        self.chunk_size = chunk_size
+        self.patterns = list(l2sca.patternlist if patterns is None else patterns)
+        self.idle = queue.Queue()
+        self.started = 0
+        self.lock = threading.Lock()
+
+        self.scratch = workspace.Workspace(prefix="jvmpool-").__enter__()
+        pattern_file = self.scratch.file("patterns.txt")
+        with open(pattern_file, 'w', encoding='utf-8') as outfile:
+            for pattern in self.patterns:
+                outfile.write(l2sca.strip_quotes(pattern) + "\n")
+
+        classpath = os.pathsep.join([workerClasses, l2sca.stanfordParserDir + "/*", "stanford-tregex.jar"])
+        self.command = ["java", "-mx" + java_heap, "-cp", classpath, "L2SCAWorker", "-patterns", pattern_file]
+        if not parser:
+            self.command.append("-noparser")
+        else:
+            self.command += ["-model", self.backend.model] + self.backend.flags
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _acquire(self):
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                with self.lock:
+                    start = self.started < self.size
+                    if start:
+                        self.started += 1
+                if start:
+                    try:
+                        return Worker(self.command)
+                    except (OSError, WorkerError):
+                        with self.lock:
+                            self.started -= 1
+                        self.idle.put(None)
+                        raise
+                worker = self.idle.get()
+            if worker is None:
+                # A worker was retired, so there may be room to start a new one
+                continue
+            if worker.alive() and (time.monotonic() - worker.last_used < self.ping_after or worker.ping()):
+                return worker
+            self._retire(worker)
+
+    def _release(self, worker):
+        if not worker.alive() or worker.requests >= self.max_requests or worker.heap > self.max_heap:
+            self._retire(worker)
+        else:
+            self.idle.put(worker)
+
+    def _retire(self, worker):
+        worker.close()
+        with self.lock:
+            self.started -= 1
+        # Wake a thread that is waiting in _acquire for a worker to become free
+        self.idle.put(None)
+
+    def request(self, command, lines=()):
+        """
+        Run one request on a free worker and return the lines of the answer.
+        """
+        worker = self._acquire()
+        try:
+            return worker.request(command, lines, timeout=self.timeout, line_timeout=self.line_timeout)
+        finally:
+            self._release(worker)
+
+    def health_check(self):
+        """
+        Ping every idle worker and retire those that do not answer. Returns the number still alive.
+        """
+        healthy = []
+        wakeups = 0
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker is None:
+                wakeups += 1
+                continue
+            if worker.ping():
+                healthy.append(worker)
+            else:
+                self._retire(worker)
+        for worker in healthy:
+            self._release(worker)
+        # Give back the wake-ups taken from the queue, since a thread may be waiting for them
+        for _ in range(wakeups):
+            self.idle.put(None)
+        return len(healthy)
+
+    def chunks(self, lines):
+        """
+        Yield the position and lines of each chunk of at most chunk_size lines.
+        """
+        lines = list(lines)
+        for start in range(0, len(lines), self.chunk_size):
+            yield start, lines[start:start + self.chunk_size]
+
+    def parse(self, sentences):
+        """
+        Parse a list of sentences and return one one-line Penn tree per sentence.
+        """
+        return [tree for _, chunk in self.chunks(sentences) for tree in self.request("PARSE", chunk)]
+
+    def parse_text(self, text):
+        """
+        Split text into sentences with the parser's tokenizer and return one tree per sentence.
+
+        A sentence may run over a line break, so the text is not chunked; the request's deadline
+        grows with its number of lines instead.
+        """
+        return self.request("PARSETEXT", text.splitlines())
+
+    def count(self, trees):
+        """
+        Count every pattern in each tree and return one list of counts per tree.
+        """
+        return [[int(count) for count in line.split()]
+                for _, chunk in self.chunks(trees) for line in self.request("COUNT", chunk)]
+
+    def match(self, trees):
+        """
+        Find every pattern in each tree and return a (tree index, pattern index, subtree) per match.
+        """
+        matches = []
+        for start, chunk in self.chunks(trees):
+            for line in self.request("MATCH", chunk):
+                tree_index, pattern_index, subtree = line.split(" ", 2)
+                matches.append((start + int(tree_index), int(pattern_index), subtree))
+        return matches
+
+    def close(self):
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker is not None:
+                worker.close()
+        self.scratch.cleanup()
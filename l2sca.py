@@ -0,0 +1,339 @@
+"""
+Shared L2SCA helpers used by the sentence-level tools.
+
+The tregex patterns, the count adjustments and the 14 indices are the same as in
+analyzeText.py and analyzeFolder.py. The difference is that every match is
+attributed to the tree (sentence) it was found in, so a single parse of a whole
+text and one Tregex run per pattern give a sentences x 9 counts matrix instead
+of a single row of totals.
+"""
+
+import difflib
+import re
+import subprocess
+
+import parsers
+import workspace
+
+#a function to divide two numbers from strings
+def division(x,y):
+    if float(x)==0 or float(y)==0:
+        return 0
+    return float(x)/float(y)
+
+#the following is a list of tregex patterns for various structures
+
+#sentence (S)
+s="'ROOT !> __'"
+
+#verb phrase (VP)
+vp="'VP > S|SINV|SQ'"
+vp_q="'MD|VBZ|VBP|VBD > (SQ !< VP)'"
+
+#clause (C)
+c="'S|SINV|SQ [> ROOT <, (VP <# VB) | <# MD|VBZ|VBP|VBD | < (VP [<# MD|VBP|VBZ|VBD | < CC < (VP <# MD|VBP|VBZ|VBD)])]'"
+
+#T-unit (T)
+t="'S|SBARQ|SINV|SQ > ROOT | [$-- S|SBARQ|SINV|SQ !>> SBAR|VP]'"
+
+#dependent clause (DC)
+dc="'SBAR < (S|SINV|SQ [> ROOT <, (VP <# VB) | <# MD|VBZ|VBP|VBD | < (VP [<# MD|VBP|VBZ|VBD | < CC < (VP <# MD|VBP|VBZ|VBD)])])'"
+
+#complex T-unit (CT)
+ct="'S|SBARQ|SINV|SQ [> ROOT | [$-- S|SBARQ|SINV|SQ !>> SBAR|VP]] << (SBAR < (S|SINV|SQ [> ROOT <, (VP <# VB) | <# MD|VBZ|VBP|VBD | < (VP [<# MD|VBP|VBZ|VBD | < CC < (VP <# MD|VBP|VBZ|VBD)])]))'"
+
+#coordinate phrase (CP)
+cp="'ADJP|ADVP|NP|VP < CC'"
+
+#complex nominal (CN)
+cn1="'NP !> NP [<< JJ|POS|PP|S|VBG | << (NP $++ NP !$+ CC)]'"
+cn2="'SBAR [<# WHNP | <# (IN < That|that|For|for) | <, S] & [$+ VP | > VP]'"
+cn3="'S < (VP <# VBG|TO) $+ VP'"
+
+#fragment clause
+fc="'FRAG > ROOT !<< (S|SINV|SQ [> ROOT <, (VP <# VB) | <# MD|VBZ|VBP|VBD | < (VP [<# MD|VBP|VBZ|VBD | < CC < (VP <# MD|VBP|VBZ|VBD)])])'"
+
+#fragment T-unit
+ft="'FRAG > ROOT !<< (S|SBARQ|SINV|SQ > ROOT | [$-- S|SBARQ|SINV|SQ !>> SBAR|VP])'"
+
+#list of patterns to search for
+patternlist=[s,vp,c,t,dc,ct,cp,cn1,cn2,cn3,fc,ft,vp_q]
+
+#abbreviations of the 9 structures and the 14 indices
+structures=["W","S","VP","C","T","DC","CT","CP","CN"]
+indices=["MLS","MLT","MLC","C/S","VP/T","C/T","DC/C","DC/T","T/S","CT/T","CP/T","CP/C","CN/T","CN/C"]
+
+#the 24 comma-delimited fields written by analyzeText.py
+fields="Filename,words (W),sentences (S),verb phrases (VP),clauses (C),T-units (T),dependent clauses (DC),complex T-units (CT),coordinate phrases (CP),complex nominals (CN),mean length of sentence (MLS),mean length of T-unit (MLT),mean length of clause (MLC),clauses per sentence (C/S),verb phrases per T-unit (VP/T),clauses per T-unit (C/T),dependent clauses per clause (DC/C),dependent clauses per T-unit (DC/T),T-units per sentence (T/S),complex T-unit ratio (CT/T),coordinate phrases per T-unit (CP/T),coordinate phrases per clause (CP/C),complex nominals per T-unit (CN/T),complex nominals per clause (CN/C)"
+
+#location of the Stanford parser and of the tregex wrapper
+stanfordParserDir=parsers.stanfordParserDir
+tregexPath="./tregex.sh"
+
+#regular expression used by L2SCA to count words in a parse
+wordPattern=re.compile("\\([A-Z]+\\$? [^\\)\\(-]+\\)")
+
+#a parse tree opens with a bracket, an optional label and a child bracket; a dependency does not
+treePattern=re.compile(r"\(\s*[^\s()]*\s*\(")
+
+
+def parse_file(input_file, parsed_file, one_sentence_per_line=False, pool=None, backend=None, cache=None):
+    """
+    Parse input_file and write its Penn trees, and nothing else, to parsed_file.
+
+    With one_sentence_per_line the parser does not re-split the text, so tree N of the
+    output is always line N of the input, and trees found in cache (a parsers.ParseCache)
+    are not parsed again. If a jvmpool.WorkerPool is given, a warm worker does the parsing
+    instead of a new JVM. backend is a parsers.ParserBackend; it defaults to the pool's
+    backend or to parsers.get_backend().
+    """
+    backend = backend or (pool.backend if pool is not None else parsers.get_backend())
+    if one_sentence_per_line or pool is not None:
+        with open(input_file, 'r', encoding='utf-8') as infile:
+            text = infile.read()
+        if one_sentence_per_line:
+            trees = parse_sentences(text.splitlines(), pool, backend, cache)
+        else:
+            trees = pool.parse_text(text)
+        with open(parsed_file, 'w', encoding='utf-8') as outfile:
+            outfile.writelines(tree + "\n" for tree in trees)
+        return
+
+    with open(parsed_file, 'w', encoding='utf-8') as outfile:
+        subprocess.run(backend.command(input_file), stdout=outfile, stderr=subprocess.DEVNULL, check=True)
+
+
+def parse_sentences(sentences, pool=None, backend=None, cache=None):
+    """
+    Parse a list of sentences and return one one-line Penn tree per sentence.
+
+    Sentences already in cache are not parsed again; new parses are added to it.
+    """
+    backend = backend or (pool.backend if pool is not None else parsers.get_backend())
+    trees = [cache.get(backend, sentence) if cache is not None else None for sentence in sentences]
+    missing = [i for i, tree in enumerate(trees) if tree is None]
+    if not missing:
+        return trees
+
+    todo = [sentences[i] for i in missing]
+    if pool is not None:
+        parsed = pool.parse(todo)
+    else:
+        with workspace.Workspace(prefix="parse-") as scratch:
+            sentences_file = scratch.file("sentences.lines")
+            with open(sentences_file, 'w', encoding='utf-8') as outfile:
+                outfile.writelines(" ".join(sentence.split()) + "\n" for sentence in todo)
+            result = subprocess.run(backend.command(sentences_file, one_sentence_per_line=True),
+                                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True)
+            parsed = [" ".join(tree.split()) for tree in split_trees(result.stdout)]
+    if len(parsed) != len(todo):
+        raise ValueError(f"parser returned {len(parsed)} trees for {len(todo)} sentences")
+
+    for i, tree in zip(missing, parsed):
+        trees[i] = tree
+        if cache is not None:
+            cache.put(backend, sentences[i], tree)
+    return trees
+
+
+def split_trees(content):
+    """
+    Split the text of a .parsed file into its balanced top-level bracket groups.
+
+    Tregex numbers every such group as a tree, including the typed dependencies printed by
+    lexparser.sh (e.g. "nsubj(join-9, Vinken-2)"), so the list keeps them to stay aligned with
+    Tregex's tree numbers. Use is_parse_tree to tell the real parse trees apart.
+    """
+    trees = []
+    depth = 0
+    start = None
+    for i, char in enumerate(content):
+        if char == '(':
+            if depth == 0:
+                start = i
+            depth += 1
+        elif char == ')' and depth > 0:
+            depth -= 1
+            if depth == 0:
+                trees.append(content[start:i + 1])
+    return trees
+
+
+def is_parse_tree(tree):
+    """
+    Return True if a bracket group from split_trees is a parse tree rather than a dependency.
+    """
+    return treePattern.match(tree) is not None
+
+
+def count_words(tree):
+    """
+    Count the words in a bracketed tree using the L2SCA word pattern.
+    """
+    return len(wordPattern.findall(tree))
+
+
+def combine_counts(patterncount):
+    """
+    Turn the 13 raw pattern counts into the 8 structure counts S, VP, C, T, DC, CT, CP, CN.
+    """
+    patterncount = list(patterncount)
+    #update frequencies of complex nominals, clauses, and T-units
+    patterncount[7]=patterncount[-4]+patterncount[-5]+patterncount[-6]
+    patterncount[2]=patterncount[2]+patterncount[-3]
+    patterncount[3]=patterncount[3]+patterncount[-2]
+    patterncount[1]=patterncount[1]+patterncount[-1]
+    return patterncount[:8]
+
+
+def compute_indices(counts):
+    """
+    Compute the 14 syntactic complexity indices from the 9 counts W, S, VP, C, T, DC, CT, CP, CN.
+    """
+    [w,s,vp,c,t,dc,ct,cp,cn]=counts
+    return [division(w,s), division(w,t), division(w,c), division(c,s), division(vp,t),
+            division(c,t), division(dc,c), division(dc,t), division(t,s), division(ct,t),
+            division(cp,t), division(cp,c), division(cn,t), division(cn,c)]
+
+
+def strip_quotes(pattern):
+    """
+    Remove the shell quotes around a pattern from patternlist.
+    """
+    if len(pattern) > 1 and pattern[0] == pattern[-1] == "'":
+        return pattern[1:-1]
+    return pattern
+
+
+def start_tregex_tree_counts(pattern, parsed_file):
+    """
+    Start a Tregex run that reports the tree number of every match of pattern in parsed_file.
+
+    With -x each match is printed as <tree>:<node>, and -o keeps the counting identical to
+    the -C -o runs used by analyzeText.py. The command is run without a shell, so the shell
+    quotes of the patterns in patternlist are removed and any file name is safe.
+    """
+    command = [tregexPath, strip_quotes(pattern), parsed_file, "-C", "-o", "-x"]
+    return subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+
+
+def collect_tregex_tree_counts(process, num_trees):
+    """
+    Wait for a Tregex run started by start_tregex_tree_counts and return its per-tree counts.
+    """
+    counts = [0] * num_trees
+    output, _ = process.communicate()
+    for line in output.splitlines():
+        tree_number, sep, node = line.strip().partition(':')
+        if sep and tree_number.isdigit() and node.isdigit():
+            index = int(tree_number) - 1
+            if 0 <= index < num_trees:
+                counts[index] += 1
+    return counts
+
+
+def tree_counts_matrix(tree_pattern_counts, trees):
+    """
+    Build the sentences x 9 matrix from the raw per-tree pattern counts and the tree texts.
+
+    tree_pattern_counts holds one list of per-tree counts for each entry of patternlist.
+    """
+    matrix = []
+    for i, tree in enumerate(trees):
+        patterncount = [counts[i] for counts in tree_pattern_counts]
+        matrix.append([count_words(tree)] + combine_counts(patterncount))
+    return matrix
+
+
+def pool_pattern_counts(pool, trees, patterns=None):
+    """
+    Count every pattern in every tree with a jvmpool.WorkerPool and return, for each pattern,
+    the list of its per-tree counts.
+
+    The worker counts the patterns it was started with, so a ValueError is raised if they are
+    not the requested patterns.
+    """
+    patterns = patternlist if patterns is None else patterns
+    if [strip_quotes(pattern) for pattern in patterns] != [strip_quotes(pattern) for pattern in pool.patterns]:
+        raise ValueError("the worker pool was started with a different set of patterns")
+    counts = pool.count(trees)
+    return [[row[i] for row in counts] for i in range(len(patterns))]
+
+
+def tree_pattern_counts(parsed_file, pool=None, patterns=None):
+    """
+    Count every pattern in every tree of parsed_file.
+
+    Returns the list of trees and, for each pattern, the list of its per-tree counts. With a
+    jvmpool.WorkerPool the trees are counted by a warm worker; otherwise each pattern is run
+    once over the whole file, with all Tregex processes running side by side, so the number
+    of JVM starts does not grow with the number of sentences.
+    """
+    patterns = patternlist if patterns is None else patterns
+    with open(parsed_file, 'r', encoding='utf-8') as infile:
+        groups = split_trees(infile.read())
+    keep = [i for i, group in enumerate(groups) if is_parse_tree(group)]
+    trees = [groups[i] for i in keep]
+
+    if pool is not None:
+        return trees, pool_pattern_counts(pool, trees, patterns)
+
+    processes = [start_tregex_tree_counts(pattern, parsed_file) for pattern in patterns]
+    group_counts = [collect_tregex_tree_counts(process, len(groups)) for process in processes]
+    return trees, [[counts[i] for i in keep] for counts in group_counts]
+
+
+def sentence_matrix(parsed_file, pool=None):
+    """
+    Count the 9 structures for every tree in parsed_file. Returns one row of 9 counts per tree.
+    """
+    trees, counts = tree_pattern_counts(parsed_file, pool)
+    return tree_counts_matrix(counts, trees)
+
+
+def tree_matrix(trees, pool=None):
+    """
+    Count the 9 structures for a list of one-line Penn trees, such as those from parse_sentences.
+    """
+    if pool is not None:
+        return tree_counts_matrix(pool_pattern_counts(pool, trees), trees)
+
+    with workspace.Workspace(prefix="count-") as scratch:
+        parsed_file = scratch.file("trees.parsed")
+        with open(parsed_file, 'w', encoding='utf-8') as outfile:
+            outfile.writelines(tree + "\n" for tree in trees)
+        return sentence_matrix(parsed_file)
+
+
+def matrix_totals(matrix):
+    """
+    Sum a sentences x 9 matrix into the 9 document-level counts.
+    """
+    return [sum(column) for column in zip(*matrix)] if matrix else [0] * len(structures)
+
+
+def update_totals(totals, previous, sentences, counts):
+    """
+    Update the 9 document totals of the sentence list previous to those of sentences.
+
+    The two lists are diffed, and only the sentences that were removed or inserted are subtracted
+    or added, so an edit costs as much as the sentences it changed. counts maps every sentence of
+    both lists to its 9 counts.
+    """
+    totals = list(totals)
+    matcher = difflib.SequenceMatcher(None, previous, sentences, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        for sentence in previous[i1:i2]:
+            totals = [a - b for a, b in zip(totals, counts[sentence])]
+        for sentence in sentences[j1:j2]:
+            totals = [a + b for a, b in zip(totals, counts[sentence])]
+    return totals
+
+
+def is_complex(counts):
+    """
+    Return True if a row of 9 counts has a complex T-unit, which marks a sentence as complex (-C).
+    """
+    return counts[6] > 0
@@ -0,0 +1,132 @@
+"""
+Selectable parser backends and a parse cache keyed by backend.
+
+A backend describes how sentences are turned into Penn trees: the Java class,
+the serialized model and the flags passed to it. The default "pcfg" backend is
+the englishPCFG model used by lexparser.sh and the original L2SCA scripts; the
+others trade some accuracy for speed and can be compared with
+benchmarkParsers.py.
+
+Trees are only comparable when they come from the same backend, so every cache
+key includes the backend's name, model and flags.
+"""
+
+import hashlib
+import os
+
+#location of the Stanford parser
+stanfordParserDir="stanford-parser-full-2020-11-17"
+
+#tagger used by the shift-reduce parser, which does not tag its input itself
+defaultTagger="edu/stanford/nlp/models/pos-tagger/english-left3words-distsim.tagger"
+
+
+class ParserBackend:
+    """
+    The command, model and flags of one way of parsing text.
+    """
+
+    def __init__(self, name, model, flags=(), main_class="edu.stanford.nlp.parser.lexparser.LexicalizedParser",
+                 java_heap="1g", description=""):
+        self.name = name
+        self.model = model
+        self.flags = list(flags)
+        self.main_class = main_class
+        self.java_heap = java_heap
+        self.description = description
+
+    def __repr__(self):
+        return f"ParserBackend({self.name!r})"
+
+    def command(self, input_file, one_sentence_per_line=False, output_dir=None):
+        """
+        Return the command that parses input_file and prints Penn trees only.
+
+        input_file may also be a list of files, which are then parsed by one JVM. With
+        output_dir the trees of each file are written to a .parsed file in output_dir
+        instead of being printed.
+        """
+        if self.main_class is None:
+            raise ValueError(f"the {self.name} backend can only be used through the worker pool (make worker)")
+        command = ["java", "-mx" + self.java_heap, "-cp", stanfordParserDir + "/*", self.main_class,
+                   "-outputFormat", "penn"] + self.flags
+        if one_sentence_per_line:
+            command += ["-sentences", "newline"]
+        if output_dir is not None:
+            command += ["-writeOutputFiles", "-outputFilesDirectory", output_dir, "-outputFilesExtension", "parsed"]
+        input_files = [input_file] if isinstance(input_file, str) else list(input_file)
+        return command + [self.model] + input_files
+
+    def signature(self):
+        """
+        A string that identifies the trees this backend produces.
+        """
+        return "\t".join([self.name, self.model] + self.flags)
+
+    def cache_key(self, sentence):
+        """
+        Return the cache key of the parse of sentence under this backend.
+        """
+        return hashlib.sha1((self.signature() + "\n" + " ".join(sentence.split())).encode('utf-8')).hexdigest()
+
+
+#the available backends, from the most accurate to the fastest
+backends = {
+    "pcfg": ParserBackend("pcfg", "edu/stanford/nlp/models/lexparser/englishPCFG.ser.gz",
+                          description="englishPCFG, as used by lexparser.sh (the L2SCA baseline)"),
+    "factored": ParserBackend("factored", "edu/stanford/nlp/models/lexparser/englishFactored.ser.gz",
+                              java_heap="2g", description="englishFactored, the factored PCFG + dependency model"),
+    "pcfg-short": ParserBackend("pcfg-short", "edu/stanford/nlp/models/lexparser/englishPCFG.ser.gz",
+                                flags=["-maxLength", "40"],
+                                description="englishPCFG, sentences over 40 tokens are not parsed"),
+    "sr": ParserBackend("sr", "edu/stanford/nlp/models/srparser/englishSR.ser.gz",
+                        flags=["-preTag", "-taggerSerializedFile", defaultTagger], main_class=None, java_heap="4g",
+                        description="shift-reduce parser (needs the srparser models jar and the worker pool)"),
+}
+
+defaultBackend="pcfg"
+
+
+def get_backend(name=None):
+    """
+    Return the backend called name, the L2SCA_PARSER environment variable, or the default.
+    """
+    name = name or os.environ.get("L2SCA_PARSER") or defaultBackend
+    if name not in backends:
+        raise ValueError(f"unknown parser backend {name!r}; choose one of {', '.join(backends)}")
+    return backends[name]
+
+
+def default_cache():
+    """
+    Return the ParseCache in the L2SCA_PARSE_CACHE directory, or None if it is not set.
+    """
+    directory = os.environ.get("L2SCA_PARSE_CACHE")
+    return ParseCache(directory) if directory else None
+
+
+class ParseCache:
+    """
+    An on-disk cache of one-line Penn trees, keyed by backend and sentence.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, backend, sentence):
+        try:
+            with open(self._path(backend.cache_key(sentence)), 'r', encoding='utf-8') as infile:
+                return infile.read()
+        except OSError:
+            return None
+
+    def put(self, backend, sentence, tree):
+        path = self._path(backend.cache_key(sentence))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as outfile:
+            outfile.write(tree)
+        os.replace(temporary, path)
@@ -0,0 +1,296 @@
+"""
+Run your own Tregex patterns over many stored parses at once.
+
+The input is any mix of corpus directories (see corpus.py), .parsed files, and
+directories that are searched for .parsed files. The documents are split into
+shards of about --shard-size sentences, and the shards are matched in parallel
+by a pool of --jobs processes. Each process keeps one warm worker (make worker)
+for all of its shards, or runs tregex.sh once per pattern and shard if the
+worker has not been built. Matches are counted the way L2SCA counts them
+(tregex -o: each node at most once as the root of a match).
+
+Results are written as CSV while the shards finish, so the rows are not in
+document order:
+    --by document    one row per document: its sentence count and the count of each pattern
+    --by sentence    one row per sentence with at least one match
+    --matches        one row per match: document, sentence, pattern number and matched subtree
+--limit stops the query as soon as that many rows have been written. Progress
+is reported on stderr; Ctrl+C stops early and keeps the rows written so far.
+Every pattern is compiled once before the query starts, and the query stops with
+the Tregex parse error if one of them is invalid.
+
+To run the script, type the following at the command line:
+python queryTregex.py -p 'SBAR < (S < VP)' [-p pattern ...] [--patterns-file file] [--by document|sentence]
+                      [--matches] [--limit N] [--jobs N] [--output results.csv] corpus_or_files...
+"""
+
+import argparse
+import csv
+import glob
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import corpus
+import jvmpool
+import l2sca
+import workspace
+
+#state kept by each process of the pool between shards
+processState = {}
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Run Tregex patterns in parallel over a corpus or .parsed files.")
+    parser.add_argument("sources", nargs="+", help="Corpus directories, .parsed files, or directories of .parsed files")
+    parser.add_argument("-p", "--pattern", action="append", default=[], help="A Tregex pattern (may be repeated)")
+    parser.add_argument("--patterns-file", help="A file with one Tregex pattern per line")
+    parser.add_argument("--by", choices=["document", "sentence"], default="document",
+                        help="Report counts per document (default) or per sentence")
+    parser.add_argument("--matches", action="store_true", help="Report every matched subtree instead of counts")
+    parser.add_argument("--limit", type=int, help="Stop after writing this many result rows")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Number of processes (default: one per CPU)")
+    parser.add_argument("--shard-size", type=int, default=2000, help="About how many sentences each shard holds")
+    parser.add_argument("--output", help="CSV file to write (default: standard output)")
+    return parser.parse_args()
+
+
+def read_patterns(args):
+    patterns = list(args.pattern)
+    if args.patterns_file:
+        with open(args.patterns_file, 'r', encoding='utf-8') as infile:
+            patterns += [line.strip() for line in infile if line.strip() and not line.startswith("#")]
+    return patterns
+
+
+def check_patterns(patterns):
+    """
+    Compile every pattern once with tregex.sh (on its built-in example tree) and return an error
+    message for each pattern that does not compile.
+
+    tregex.sh prints parse errors on stderr but still exits with 0, so without this check a
+    mistyped pattern would simply match nothing in every shard.
+    """
+    processes = [subprocess.Popen([l2sca.tregexPath, pattern, "-C"], stdout=subprocess.DEVNULL,
+                                  stderr=subprocess.PIPE, text=True) for pattern in patterns]
+    errors = []
+    for pattern, process in zip(patterns, processes):
+        _, stderr = process.communicate()
+        messages = [line.strip() for line in stderr.splitlines() if line.startswith("Parse exception")]
+        if messages:
+            errors.append(f"{pattern}: {messages[0]}")
+        elif process.returncode != 0:
+            last = stderr.strip().splitlines()[-1] if stderr.strip() else f"exit status {process.returncode}"
+            errors.append(f"{pattern}: could not run {l2sca.tregexPath}: {last}")
+    return errors
+
+
+def find_documents(sources):
+    """
+    Return (source, document key, name, estimated sentences) for every document in sources.
+    """
+    documents = []
+    for source in sources:
+        if os.path.isdir(source) and os.path.exists(os.path.join(source, "corpus.json")):
+            with corpus.Corpus(source) as stored:
+                for document in stored.documents:
+                    documents.append((source, document["id"], document["name"], document["sentences"]))
+        elif os.path.isdir(source):
+            for filename in sorted(glob.glob(os.path.join(source, "**", "*.parsed"), recursive=True)):
+                documents.append((None, filename, filename, max(1, os.path.getsize(filename) // 500)))
+        elif os.path.isfile(source):
+            documents.append((None, source, source, max(1, os.path.getsize(source) // 500)))
+        else:
+            raise FileNotFoundError(f"{source} is not a corpus, .parsed file or directory")
+    return documents
+
+
+def make_shards(documents, shard_size):
+    """
+    Group documents into shards of about shard_size (estimated) sentences.
+    """
+    shards = []
+    shard = []
+    size = 0
+    for document in documents:
+        shard.append(document)
+        size += document[3]
+        if size >= shard_size:
+            shards.append(shard)
+            shard = []
+            size = 0
+    if shard:
+        shards.append(shard)
+    return shards
+
+
+def init_process(patterns, mode, limit):
+    processState.update({"patterns": patterns, "mode": mode, "limit": limit, "corpora": {}, "pool": None})
+
+
+def load_trees(source, key):
+    if source is None:
+        return corpus.read_parsed_file(key)
+    corpora = processState["corpora"]
+    if source not in corpora:
+        corpora[source] = corpus.Corpus(source)
+    return list(corpora[source].trees(key))
+
+
+def match_with_worker(trees, count_only):
+    """
+    Return the per-tree pattern counts, or the (tree, pattern, subtree) matches, from a warm worker.
+    """
+    if processState["pool"] is None:
+        processState["pool"] = jvmpool.WorkerPool(patterns=processState["patterns"], parser=False)
+    if count_only:
+        return processState["pool"].count(trees)
+    return processState["pool"].match(trees)
+
+
+def match_with_tregex(trees, count_only):
+    """
+    The same as match_with_worker, with one tregex.sh run per pattern over a temporary file.
+    """
+    patterns = processState["patterns"]
+    with workspace.Workspace(prefix="query-") as scratch:
+        parsed_file = scratch.file("shard.parsed")
+        with open(parsed_file, 'w', encoding='utf-8') as outfile:
+            outfile.writelines(tree + "\n" for tree in trees)
+        if count_only:
+            processes = [l2sca.start_tregex_tree_counts(pattern, parsed_file) for pattern in patterns]
+            counts = [l2sca.collect_tregex_tree_counts(process, len(trees)) for process in processes]
+            return [[column[i] for column in counts] for i in range(len(trees))]
+
+        matches = []
+        for j, pattern in enumerate(patterns):
+            # -n -s prints "<tree number>: <subtree on one line>" for every match
+            result = subprocess.run([l2sca.tregexPath, pattern, parsed_file, "-o", "-n", "-s"], stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, text=True, check=True)
+            for line in result.stdout.splitlines():
+                tree_number, sep, subtree = line.partition(": ")
+                if sep and tree_number.strip().isdigit():
+                    matches.append((int(tree_number) - 1, j, subtree.strip()))
+        return sorted(matches, key=lambda match: match[:2])
+
+
+def run_shard(shard):
+    """
+    Match the patterns in every document of a shard. Returns (rows, sentences, error).
+    """
+    mode = processState["mode"]
+    limit = processState["limit"]
+    rows = []
+    sentences = 0
+    try:
+        matcher = match_with_worker if jvmpool.available() else match_with_tregex
+        for source, key, name, _ in shard:
+            trees = load_trees(source, key)
+            sentences += len(trees)
+            if not trees:
+                if mode == "document":
+                    rows.append([name, 0] + [0] * len(processState["patterns"]))
+                continue
+            if mode == "matches":
+                rows += [[name, i + 1, j + 1, subtree] for i, j, subtree in matcher(trees, False)]
+            else:
+                counts = matcher(trees, True)
+                if mode == "document":
+                    rows.append([name, len(trees)] + [sum(column) for column in zip(*counts)])
+                else:
+                    rows += [[name, i + 1] + row for i, row in enumerate(counts) if any(row)]
+            if limit is not None and len(rows) >= limit:
+                break
+    except (OSError, ValueError, corpus.CorpusError, subprocess.CalledProcessError, jvmpool.WorkerError) as e:
+        return rows, sentences, f"{shard[0][2]}...: {e}"
+    return rows, sentences, None
+
+
+def main():
+    args = parse_arguments()
+    patterns = read_patterns(args)
+    if not patterns:
+        print("Give at least one pattern with -p or --patterns-file.")
+        sys.exit(1)
+    try:
+        errors = check_patterns(patterns)
+    except OSError as e:
+        errors = [f"could not run {l2sca.tregexPath}: {e}"]
+    if errors:
+        print("Invalid Tregex pattern:" if len(errors) == 1 else "Invalid Tregex patterns:")
+        for error in errors:
+            print("  " + error)
+        sys.exit(1)
+    try:
+        documents = find_documents(args.sources)
+    except (OSError, corpus.CorpusError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    shards = make_shards(documents, args.shard_size)
+    mode = "matches" if args.matches else args.by
+
+    if mode == "matches":
+        header = ["Document", "Sentence", "Pattern", "Match"]
+    elif mode == "sentence":
+        header = ["Document", "Sentence"] + patterns
+    else:
+        header = ["Document", "Sentences"] + patterns
+
+    outfile = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    writer = csv.writer(outfile)
+    writer.writerow(header)
+
+    start = time.perf_counter()
+    written = 0
+    sentences = 0
+    finished = 0
+    failures = []
+    stopped = None
+    # The workspaces of the processes are created inside this one, so they are removed
+    # even when the processes are terminated early
+    with workspace.Workspace(prefix="query-") as scratch:
+        os.environ["L2SCA_SCRATCH"] = scratch.path
+        pool = multiprocessing.Pool(max(1, args.jobs), initializer=init_process, initargs=(patterns, mode, args.limit))
+        try:
+            for rows, shard_sentences, error in pool.imap_unordered(run_shard, shards):
+                finished += 1
+                sentences += shard_sentences
+                if error:
+                    failures.append(error)
+                if args.limit is not None:
+                    rows = rows[:args.limit - written]
+                writer.writerows(rows)
+                outfile.flush()
+                written += len(rows)
+                elapsed = time.perf_counter() - start
+                print(f"\r{finished}/{len(shards)} shards, {sentences} sentences, {written} rows "
+                      f"({sentences / elapsed if elapsed else 0:.0f} sentences/sec)", end="", file=sys.stderr)
+                if args.limit is not None and written >= args.limit:
+                    stopped = f"reached the limit of {args.limit} rows"
+                    break
+            pool.close()
+        except KeyboardInterrupt:
+            stopped = "interrupted"
+        finally:
+            # Stops the shards still running, and with them their workers
+            pool.terminate()
+            pool.join()
+            if outfile is not sys.stdout:
+                outfile.close()
+
+    elapsed = time.perf_counter() - start
+    print(file=sys.stderr)
+    if stopped:
+        print(f"Stopped early ({stopped}) after {finished} of {len(shards)} shards.", file=sys.stderr)
+    print(f"{written} rows from {sentences} sentences in {len(documents)} documents, {elapsed:.1f} seconds.",
+          file=sys.stderr)
+    for failure in failures:
+        print("  failed:", failure, file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
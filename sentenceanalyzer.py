@@ -7,6 +7,15 @@ import csv
 import glob
 import re
 import shutil
+import concurrent.futures
+import contextlib
+import time
+
+import draftanalyzer
+import jvmpool
+import l2sca
+import parsers
+import workspace
 
 
 def check_pdflatex():
@@ -70,40 +79,72 @@ def main():
     # First, check for NLTK availability
     check_nltk_availability()
 
-    if len(sys.argv) != 2:
-        print("Usage: {} <textfile>".format(sys.argv[0]))
+    # --draft replaces the full parse with the fast POS-tag estimates of draftanalyzer.py
+    # --watch keeps re-analyzing the file each time it is saved
+    # --roster reports on every submission in a directory or manifest, --jobs=N PDFs at a time
+    draft = "--draft" in sys.argv[1:]
+    watching = "--watch" in sys.argv[1:]
+    roster = "--roster" in sys.argv[1:]
+    jobs = None
+    args = []
+    for arg in sys.argv[1:]:
+        if arg.startswith("--jobs="):
+            try:
+                jobs = max(1, int(arg[len("--jobs="):]))
+            except ValueError:
+                print("--jobs needs a number, e.g. --jobs=4")
+                sys.exit(1)
+        elif arg not in ("--draft", "--watch", "--roster"):
+            args.append(arg)
+
+    if len(args) not in (1, 2):
+        print("Usage: {} [--draft] [--watch] <textfile> [output_directory]".format(sys.argv[0]))
+        print("       {} [--draft] --roster [--jobs=N] <directory|manifest> [output_directory]".format(sys.argv[0]))
         sys.exit(1)
 
-    filename = sys.argv[1]
+    if roster:
+        source = args[0]
+        source_dir = source if os.path.isdir(source) else os.path.dirname(os.path.abspath(source))
+        run_roster(source, args[1] if len(args) == 2 else source_dir, draft, jobs)
+        return
+
+    filename = args[0]
 
     if not os.path.isfile(filename) or not is_text_file(filename):
     	print("Error: The specified file does not exist, is a directory, or is not a plain .txt file.")
     	sys.exit(1)
 
+    # The PDF is published next to the input unless another directory is given
+    destination_dir = args[1] if len(args) == 2 else os.path.dirname(os.path.abspath(filename))
+
+    if watching:
+        watch(filename, destination_dir, draft)
+        return
+
     print("Processing text file:", filename)
     append_text = "_process"
-    base_name = os.path.splitext(filename)[0]  # Securely strip extension
-    filenameproc = f"{base_name}{append_text}.txt"
+    base_name = os.path.splitext(os.path.basename(filename))[0]  # Securely strip extension
 
-    # Process and save the file
-    process_and_save_file(filename, filenameproc)
+    # All intermediate files live in a private workspace that is removed when the run ends
+    with workspace.Workspace(prefix="sentenceanalyzer-") as scratch:
+        filenameproc = scratch.file(f"{base_name}{append_text}.txt")
 
-    output_dir = os.path.join(os.path.dirname(filename), f"{os.path.splitext(os.path.basename(filename))[0]}_sentences")
-    tokenize_sentences(filenameproc, output_dir)
+        # Process and save the file
+        process_and_save_file(filename, filenameproc)
 
-    sentence_files = sorted(glob.glob(os.path.join(output_dir, "*.txt")))
-    analyze_text(output_dir, filenameproc)
+        output_dir = scratch.file(f"{base_name}_sentences")
+        tokenize_sentences(filenameproc, output_dir)
 
-    analysis_csv = os.path.join(output_dir, "analysis.csv")
-    transposed_csv = os.path.join(output_dir, "analysis_transposed.csv")
-    transpose_csv(analysis_csv, transposed_csv)
+        analyze_text(output_dir, filenameproc, draft)
+
+        analysis_csv = os.path.join(output_dir, "analysis.csv")
+        transposed_csv = os.path.join(output_dir, "analysis_transposed.csv")
+        transpose_csv(analysis_csv, transposed_csv)
 
-    files_to_combine = sorted(glob.glob(os.path.join(output_dir, "*[0-9][0-9][0-9]-[CS].txt")))
-    latex_file = os.path.join(output_dir, "combined_sentences.tex")
-    create_latex_document(files_to_combine, latex_file, transposed_csv)
-    generate_pdf(latex_file, filename)
-	
-    cleanup_files(filenameproc, output_dir)
+        files_to_combine = sorted(glob.glob(os.path.join(output_dir, "*[0-9][0-9][0-9]-[CS].txt")))
+        latex_file = os.path.join(output_dir, "combined_sentences.tex")
+        create_latex_document(files_to_combine, latex_file, transposed_csv, draft)
+        generate_pdf(latex_file, filename, destination_dir)
 
 
 # Assuming the pattern is defined globally
@@ -152,55 +193,349 @@ def tokenize_sentences(input_file, output_dir):
         print(f"An operating system error occurred: {e}")
 
 
-def analyze_text(output_dir, filenameproc):
+def analyze_text(output_dir, filenameproc, draft=False):
     """
-    Analyze all files in output_dir using analyzeFolder.py.
-    Rename each file based on the analysis result in the generated CSV file.
+    Analyze all sentence files in output_dir with a single parse and one Tregex run per pattern,
+    or with the approximate draft estimates if draft is True.
+    Rename each file based on its complex T-unit count and write the document totals to analysis.csv.
     """
-    # Define paths to the scripts and CSV files
-    analysis_folder_csv = os.path.join(output_dir, "folder_analysis.csv")
     analysis_text_csv = os.path.join(output_dir, "analysis.csv")
-    
-    # Define the Python executable
-    python_exec = sys.executable
-
-    # Run analyzeFolder.py on the output_dir
-    folder_result = subprocess.run([python_exec, "analyzeFolder.py", output_dir, analysis_folder_csv])
-    # print("analyzeFolder.py output:", folder_result.stdout)
-    if folder_result.returncode != 0:
-        print("Error running analyzeFolder.py:", folder_result.stderr)
-        return
+    sentences_file = os.path.join(output_dir, "sentences.lines")
+    parsed_file = os.path.join(output_dir, "sentences.parsed")
 
+    sentence_files = sorted(glob.glob(os.path.join(output_dir, "*[0-9][0-9][0-9].txt")))
 
-    # Process CSV output from analyzeFolder.py
+    # Write one sentence per line so that tree N of the parse belongs to sentence file N
     try:
-        with open(analysis_folder_csv, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            headers = next(reader)  # Skip the header row
+        with open(sentences_file, 'w', encoding='utf-8') as outfile:
+            for sentence_file in sentence_files:
+                with open(sentence_file, 'r', encoding='utf-8') as infile:
+                    outfile.write(" ".join(infile.read().split()) + "\n")
+
+        if draft:
+            with open(sentences_file, 'r', encoding='utf-8') as infile:
+                matrix = draftanalyzer.sentence_matrix(infile.read().splitlines())
+        else:
+            # Use a warm parser and Tregex worker when one has been built with "make worker"
+            with jvmpool.optional_pool() as pool:
+                l2sca.parse_file(sentences_file, parsed_file, one_sentence_per_line=True, pool=pool,
+                                 cache=parsers.default_cache())
+                matrix = l2sca.sentence_matrix(parsed_file, pool)
+    except (OSError, ValueError, subprocess.CalledProcessError, jvmpool.WorkerError) as e:
+        print(f"Error analyzing sentences: {e}")
+        return
 
-            for row in reader:
-                if len(row) < 8:
-                    continue  # Skip rows that do not have enough columns
+    if len(matrix) != len(sentence_files):
+        print(f"Parser returned {len(matrix)} trees for {len(sentence_files)} sentences.")
 
-                filename = row[0]  # The first cell is the filename
-                sentence_file = os.path.join(output_dir, filename)
-                analysis_result = row[7]
+    for sentence_file, counts in zip(sentence_files, matrix):
+        # Column 6 of the 9 counts is the number of complex T-units (CT)
+        new_suffix = "-C" if l2sca.is_complex(counts) else "-S"
+        new_sentence_filename = f"{os.path.splitext(sentence_file)[0]}{new_suffix}{os.path.splitext(sentence_file)[1]}"
+        os.rename(sentence_file, new_sentence_filename)
 
-                # Determine new filename based on analysis result
-                new_suffix = "-C" if analysis_result.isdigit() and int(analysis_result) > 0 else "-S"
-                new_sentence_filename = f"{os.path.splitext(sentence_file)[0]}{new_suffix}{os.path.splitext(sentence_file)[1]}"
+    # The document totals are the column sums of the sentence matrix
+    write_analysis_csv(analysis_text_csv, os.path.basename(filenameproc), l2sca.matrix_totals(matrix))
 
-                if new_sentence_filename != sentence_file:
-                    os.rename(sentence_file, new_sentence_filename)
 
-    except Exception as e:
-        print(f"Failed to process CSV: {e}")
+def write_analysis_csv(analysis_csv, name, totals):
+    """
+    Write the 9 document totals and the 14 indices computed from them to analysis_csv.
+    """
+    with open(analysis_csv, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(l2sca.fields.split(","))
+        writer.writerow([name] + list(totals) + ["%.4F" % ratio for ratio in l2sca.compute_indices(totals)])
+
+
+def read_sentences(filename, filenameproc, tokenizer):
+    """
+    Normalize filename into filenameproc the same way as a normal run and return its sentences.
+    """
+    process_and_save_file(filename, filenameproc)
+    with open(filenameproc, 'r', encoding='utf-8') as f:
+        return tokenizer.tokenize(f.read())
 
-    # Run analyzeText.py on the processed data
-    text_result = subprocess.run([python_exec, "analyzeText.py", filenameproc, analysis_text_csv])
-    # print("analyzeText.py output:", text_result.stdout)
-    if text_result.returncode != 0:
-        print("Error running analyzeText.py:", text_result.stderr)
+
+def analyze_sentences(sentences, pool, draft=False):
+    """
+    Return the 9 counts of each sentence, parsing and counting only the given sentences.
+    """
+    if not sentences:
+        return []
+    if draft:
+        return draftanalyzer.sentence_matrix([" ".join(sentence.split()) for sentence in sentences])
+    trees = l2sca.parse_sentences(sentences, pool, cache=parsers.default_cache())
+    return l2sca.tree_matrix(trees, pool)
+
+
+def write_report(sentences, matrix, totals, report_dir, filenameproc, filename, destination_dir, draft=False):
+    """
+    Write the sentence files, analysis CSVs and LaTeX document for one version of the text
+    into report_dir and publish its PDF, as main() does for a single run.
+    Returns the path of the published PDF, or None if it could not be generated.
+    """
+    os.makedirs(report_dir, exist_ok=True)
+    base_name = os.path.splitext(os.path.basename(filenameproc))[0]
+    files_to_combine = []
+    for i, (sentence, counts) in enumerate(zip(sentences, matrix), start=1):
+        suffix = "-C" if l2sca.is_complex(counts) else "-S"
+        sentence_filename = os.path.join(report_dir, f"{base_name}-{i:03d}{suffix}.txt")
+        with open(sentence_filename, 'w', encoding='utf-8') as sentence_file:
+            sentence_file.write(sentence)
+        files_to_combine.append(sentence_filename)
+
+    analysis_csv = os.path.join(report_dir, "analysis.csv")
+    transposed_csv = os.path.join(report_dir, "analysis_transposed.csv")
+    write_analysis_csv(analysis_csv, os.path.basename(filenameproc), totals)
+    transpose_csv(analysis_csv, transposed_csv)
+
+    latex_file = os.path.join(report_dir, "combined_sentences.tex")
+    create_latex_document(files_to_combine, latex_file, transposed_csv, draft)
+    return generate_pdf(latex_file, filename, destination_dir)
+
+
+def watch(filename, destination_dir, draft=False, interval=0.5):
+    """
+    Re-analyze filename every time it is saved until interrupted with Ctrl+C.
+
+    The new sentence list is diffed against the previous one, and only inserted or changed
+    sentences are parsed and counted. One worker pool stays open for the whole session, so
+    the parser model and patterns are loaded once; without a built worker every update
+    starts new JVMs, which is slow, and a warning says so. The counts of the current
+    sentences are kept, so l2sca.update_totals only subtracts the removed sentences and
+    adds the new ones, and the 14 indices are recomputed from those totals.
+    """
+    tokenizer = nltk.data.load('tokenizers/punkt/english.pickle')
+    base_name = os.path.splitext(os.path.basename(filename))[0]
+
+    with workspace.Workspace(prefix="sentenceanalyzer-") as scratch, \
+         (contextlib.nullcontext() if draft else jvmpool.optional_pool()) as pool:
+        filenameproc = scratch.file(f"{base_name}_process.txt")
+        known = {}  # sentence -> its 9 counts
+        previous = []
+        totals = [0] * len(l2sca.structures)
+        last_stat = None
+        version = 0
+
+        if not draft and pool is None:
+            # Without the worker nothing stays loaded between saves
+            print("Warning: the warm worker has not been built (make worker), so every save starts a parser JVM")
+            print("that reloads the model and 13 Tregex JVMs; expect several seconds per update instead of about")
+            print("one. Run 'make worker' once, or use --draft for instant approximate feedback.")
+        print(f"Watching {filename}; press Ctrl+C to stop.")
+        try:
+            while True:
+                try:
+                    stat = os.stat(filename)
+                except OSError:
+                    # Editors often replace the file on save, so it may briefly be missing
+                    time.sleep(interval)
+                    continue
+                if (stat.st_mtime_ns, stat.st_size) == last_stat:
+                    time.sleep(interval)
+                    continue
+                last_stat = (stat.st_mtime_ns, stat.st_size)
+
+                start = time.perf_counter()
+                sentences = read_sentences(filename, filenameproc, tokenizer)
+                if sentences == previous and version > 0:
+                    continue
+
+                todo = list(dict.fromkeys(sentence for sentence in sentences if sentence not in known))
+                try:
+                    known.update(zip(todo, analyze_sentences(todo, pool, draft)))
+                except (OSError, ValueError, subprocess.CalledProcessError, jvmpool.WorkerError) as e:
+                    print(f"Error analyzing sentences: {e}")
+                    continue
+
+                # Update the totals from the sentences that were removed or inserted
+                totals = l2sca.update_totals(totals, previous, sentences, known)
+                previous = sentences
+                known = {sentence: known[sentence] for sentence in sentences}
+
+                # Each version gets a fresh directory so no stale sentence or LaTeX files remain
+                version += 1
+                report_dir = scratch.file(f"{base_name}_sentences_{version:04d}")
+                write_report(sentences, [known[sentence] for sentence in sentences], totals,
+                             report_dir, filenameproc, filename, destination_dir, draft)
+                shutil.rmtree(scratch.file(f"{base_name}_sentences_{version - 1:04d}"), ignore_errors=True)
+
+                print(f"Updated {len(sentences)} sentences ({len(todo)} re-analyzed) "
+                      f"in {time.perf_counter() - start:.2f} seconds.")
+        except KeyboardInterrupt:
+            print("Stopped watching", filename)
+
+
+def roster_files(source):
+    """
+    Return the submissions of a roster: the .txt files in a directory, or the files listed
+    one per line in a manifest (blank lines and lines starting with # are skipped, and
+    relative paths are taken relative to the manifest).
+    """
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, "*.txt")))
+    files = []
+    with open(source, 'r', encoding='utf-8') as manifest:
+        for line in manifest:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                files.append(os.path.join(os.path.dirname(os.path.abspath(source)), line))
+    return files
+
+
+def roster_batches(students, batch_size):
+    """
+    Group students into batches of about batch_size sentences for the shared parse.
+    """
+    batch = []
+    size = 0
+    for student in students:
+        batch.append(student)
+        size += len(student["sentences"])
+        if size >= batch_size:
+            yield batch
+            batch = []
+            size = 0
+    if batch:
+        yield batch
+
+
+def run_roster(source, destination_dir, draft=False, jobs=None, batch_size=500):
+    """
+    Generate a report for every submission in a roster directory or manifest.
+
+    The sentences of all students go through one shared parse and count pipeline (one warm
+    worker pool, or one parser run and one Tregex run per pattern for each batch of about
+    batch_size sentences; the worker gets each batch in requests of at most chunk_size
+    sentences, see jvmpool.WorkerPool), and the PDFs are then rendered in parallel by at most jobs
+    pdflatex processes. A summary CSV of every student's counts and indices is saved as
+    roster_summary.csv in destination_dir.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    try:
+        files = roster_files(source)
+    except OSError as e:
+        print(f"Could not read the roster {source}: {e}")
+        sys.exit(1)
+    if not files:
+        print("No submissions found in", source)
+        sys.exit(1)
+    os.makedirs(destination_dir, exist_ok=True)
+
+    tokenizer = nltk.data.load('tokenizers/punkt/english.pickle')
+    start = time.perf_counter()
+    students = []
+
+    with workspace.Workspace(prefix="roster-") as scratch, \
+         (contextlib.nullcontext() if draft else jvmpool.optional_pool()) as pool:
+        # Normalize and split every submission
+        seen = set()
+        for i, filename in enumerate(files, start=1):
+            base_name = os.path.splitext(os.path.basename(filename))[0]
+            student = {"filename": filename, "base": base_name, "sentences": [], "matrix": None,
+                       "totals": None, "report": None, "error": None}
+            students.append(student)
+            if base_name in seen:
+                student["error"] = "another submission has the same file name"
+                continue
+            seen.add(base_name)
+            if not os.path.isfile(filename) or not is_text_file(filename):
+                student["error"] = "not a readable plain .txt file"
+                continue
+            student_dir = scratch.file(f"{i:04d}")
+            os.makedirs(student_dir)
+            student["filenameproc"] = os.path.join(student_dir, f"{base_name}_process.txt")
+            try:
+                student["sentences"] = read_sentences(filename, student["filenameproc"], tokenizer)
+            except (OSError, UnicodeDecodeError) as e:
+                student["error"] = str(e)
+                continue
+            if not student["sentences"]:
+                student["error"] = "no sentences found"
+
+        # Parse and count the sentences of all students together
+        pending = [student for student in students if student["error"] is None]
+        total_sentences = sum(len(student["sentences"]) for student in pending)
+        print(f"Analyzing {total_sentences} sentences from {len(pending)} submissions...")
+        known = {}
+        processed = 0
+        analyzed = 0
+        analysis_start = time.perf_counter()
+        errors = (OSError, ValueError, subprocess.CalledProcessError, jvmpool.WorkerError)
+        for batch in roster_batches(pending, batch_size):
+            todo = list(dict.fromkeys(sentence for student in batch for sentence in student["sentences"]
+                                      if sentence not in known))
+            try:
+                known.update(zip(todo, analyze_sentences(todo, pool, draft)))
+            except errors as e:
+                # Retry the students of the failed batch one by one to find the one that fails
+                print(f"Batch failed ({e}); retrying its submissions one at a time.")
+                for student in batch:
+                    todo = list(dict.fromkeys(sentence for sentence in student["sentences"] if sentence not in known))
+                    try:
+                        known.update(zip(todo, analyze_sentences(todo, pool, draft)))
+                    except errors as e:
+                        student["error"] = f"analysis failed: {e}"
+            for student in batch:
+                if student["error"] is None:
+                    student["matrix"] = [known[sentence] for sentence in student["sentences"]]
+                    student["totals"] = l2sca.matrix_totals(student["matrix"])
+            # The rate counts only the sentences of students whose analysis succeeded
+            processed += sum(len(student["sentences"]) for student in batch)
+            analyzed += sum(len(student["sentences"]) for student in batch if student["error"] is None)
+            elapsed = time.perf_counter() - analysis_start
+            print(f"Processed {processed}/{total_sentences} sentences, {analyzed} analyzed "
+                  f"({analyzed / elapsed if elapsed else 0:.1f} sentences/sec)")
+
+        # Render the reports in parallel
+        pending = [student for student in students if student["error"] is None]
+        print(f"Rendering {len(pending)} reports with {jobs} parallel jobs...")
+        render_start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {}
+            for student in pending:
+                report_dir = os.path.join(os.path.dirname(student["filenameproc"]), f"{student['base']}_sentences")
+                future = executor.submit(write_report, student["sentences"], student["matrix"], student["totals"],
+                                         report_dir, student["filenameproc"], student["filename"], destination_dir,
+                                         draft)
+                futures[future] = student
+            for done, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+                student = futures[future]
+                try:
+                    student["report"] = future.result()
+                    if student["report"] is None:
+                        student["error"] = "PDF generation failed"
+                except Exception as e:
+                    student["error"] = f"report failed: {e}"
+                print(f"[{done}/{len(pending)}] {student['base']}: {student['error'] or 'done'}")
+        render_time = time.perf_counter() - render_start
+
+        # Summary of every student, including those that failed
+        summary_csv = scratch.file("roster_summary.csv")
+        with open(summary_csv, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(l2sca.fields.split(",") + ["Report", "Error"])
+            for student in students:
+                if student["totals"] is not None:
+                    measures = student["totals"] + ["%.4F" % ratio for ratio in l2sca.compute_indices(student["totals"])]
+                else:
+                    measures = [""] * (len(l2sca.structures) + len(l2sca.indices))
+                writer.writerow([os.path.basename(student["filename"])] + measures +
+                                [student["report"] or "", student["error"] or ""])
+        summary_output = os.path.join(destination_dir, "roster_summary.csv")
+        workspace.publish(summary_csv, summary_output)
+
+    elapsed = time.perf_counter() - start
+    failed = [student for student in students if student["error"] is not None]
+    generated = len(students) - len(failed)
+    print()
+    print(f"{generated} reports generated, {len(failed)} failed, in {elapsed:.1f} seconds "
+          f"({generated / elapsed * 60:.1f} reports/min; "
+          f"rendering {generated / render_time if render_time else 0:.2f} reports/sec).")
+    for student in failed:
+        print(f"  {student['filename']}: {student['error']}")
+    print("Summary saved to", summary_output)
 
 
 def transpose_csv(input_csv, output_csv):
@@ -255,10 +590,19 @@ def latex_escape(text):
     regex = re.compile('|'.join(re.escape(key) for key in replacements.keys()))
     return regex.sub(lambda match: replacements[match.group()], text)
 
-def create_latex_document(files_to_combine, latex_file, output_csv):
+def create_latex_document(files_to_combine, latex_file, output_csv, draft=False):
     """
     Creates a LaTeX document from text files and a CSV file.
+    With draft=True the report says that the highlighting and numbers are approximate estimates.
     """
+    if draft:
+        analysis_note = (r"This PDF file contains your text color-coded according to a \textbf{quick approximate estimate} "
+                         r"of L2SCA syntactic complexity (draft mode). The highlighting and the numbers are estimated "
+                         r"from part-of-speech tags, not from a full L2SCA analysis, and may differ from it.")
+        table_title = r"L2SCA Analysis (approximate draft estimates)"
+    else:
+        analysis_note = r"This PDF file contains your text color-coded according to L2SCA analysis of syntactic complexity."
+        table_title = r"L2SCA Analysis"
     try:
         with open(latex_file, 'w', encoding='utf-8') as f:
             # LaTeX document header
@@ -268,7 +612,7 @@ def create_latex_document(files_to_combine, latex_file, output_csv):
 \usepackage{booktabs}
 \begin{document}
 \indent \textbf{Analysis notes:} \newline
-\indent This PDF file contains your text color-coded according to L2SCA analysis of syntactic complexity.
+\indent """ + analysis_note + r"""
 \begin{color}{orange}
 Syntactically complex sentences have been highlighted in \textbf{orange}, so that you may write more sentences like these in the future. 
 \end{color}
@@ -304,7 +648,7 @@ Try to combine sentences that are not highlighted to make them more syntacticall
             # Add CSV data
             latex_path = output_csv.replace('\\', '/')  # Ensuring path compatibility in LaTeX
             f.write(r"""\newpage 
-\textbf{L2SCA Analysis}\newline \newline 
+\textbf{""" + table_title + r"""}\newline \newline 
 \csvautobooktabular{""" + latex_path + r"""}
 \end{document}""")
 
@@ -321,27 +665,28 @@ def compile_latex(latex_file):
     except subprocess.CalledProcessError:
         print("Failed to compile the LaTeX document.")
 
-def generate_pdf(latex_file, filename):
+def generate_pdf(latex_file, filename, destination_dir):
     """
     Generate a PDF from a LaTeX file using pdflatex.
-    The PDF is saved in the original directory with the original filename
-    and '_analysis' appended.
+    The PDF is compiled next to the LaTeX file and then published atomically to
+    destination_dir with the original filename and '_analysis' appended.
+    Returns the path of the published PDF, or None if it could not be generated.
     """
     output_dir = os.path.dirname(latex_file)
-    base_name = os.path.splitext(filename)[0]
-    pdf_output_filename = os.path.join(output_dir, f"{base_name}_analysis.pdf")
+    base_name = os.path.splitext(os.path.basename(filename))[0]
+    pdf_output_filename = os.path.join(destination_dir, f"{base_name}_analysis.pdf")
 
     if shutil.which("pdflatex"):
         result = subprocess.run(["pdflatex", "-output-directory=" + output_dir, latex_file], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
         if result.returncode == 0:
-            # Rename the output PDF to the desired name
             pdf_generated = os.path.join(output_dir, os.path.splitext(os.path.basename(latex_file))[0] + ".pdf")
             if os.path.exists(pdf_generated):
-                os.rename(pdf_generated, pdf_output_filename)
-                print("PDF generated:", pdf_output_filename)
-
-                # Copy the generated PDF to the same directory as the script and text files
-                shutil.copy(pdf_output_filename, os.path.join(os.path.dirname(os.path.realpath(__file__)), os.path.basename(pdf_output_filename)))
+                try:
+                    workspace.publish(pdf_generated, pdf_output_filename)
+                    print("PDF generated:", pdf_output_filename)
+                    return pdf_output_filename
+                except OSError as e:
+                    print(f"Could not save the PDF to {destination_dir}: {e}")
             else:
                 print("Expected PDF not found. Check LaTeX output for errors.")
         else:
@@ -349,19 +694,5 @@ def generate_pdf(latex_file, filename):
     else:
         print("pdflatex not found. Please install TeX Live or MacTeX to generate the PDF.")
 
-def cleanup_files(filenameproc, output_dir):
-    try:
-        # Remove the processed file if it exists
-        if os.path.exists(filenameproc):
-            os.remove(filenameproc)
-        
-        # Use shutil.rmtree to handle directory cleanup, including non-empty directories
-        if os.path.exists(output_dir):
-            shutil.rmtree(output_dir)
-
-    except OSError as e:
-        # Only print errors if they occur during cleanup
-        print(f"Error during cleanup: {e}")
-
 if __name__ == "__main__":
     main()
@@ -0,0 +1,90 @@
+"""
+Round-trip test of the corpus format: import samples/wsj_0001.parsed, look its sentences up,
+and export it back to PTB text.
+
+To run the test, type the following at the command line:
+python -m unittest test_corpus
+"""
+
+import io
+import os
+import tempfile
+import unittest
+
+import corpus
+import l2sca
+
+
+class CorpusRoundTripTest(unittest.TestCase):
+
+    parsed_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples", "wsj_0001.parsed")
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "corpus")
+        with open(self.parsed_file, 'r', encoding='utf-8') as infile:
+            self.expected = [" ".join(tree.split()) for tree in l2sca.split_trees(infile.read())
+                             if l2sca.is_parse_tree(tree)]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_import_show_export(self):
+        with corpus.Corpus(self.path, "a") as stored:
+            document = stored.import_parsed(self.parsed_file, metadata={"term": "test"})
+        self.assertEqual(document["sentences"], 2)
+
+        with corpus.Corpus(self.path) as stored:
+            self.assertEqual(stored.document("wsj_0001")["term"], "test")
+            # the typed dependencies of the .parsed file are not stored as trees
+            self.assertEqual([stored.tree("wsj_0001", i) for i in (1, 2)], self.expected)
+            self.assertEqual(stored.tree(0, 2), self.expected[1])
+            with self.assertRaises(corpus.CorpusError):
+                stored.tree("wsj_0001", 3)
+
+            exported = io.StringIO()
+            stored.export("wsj_0001", exported)
+        self.assertEqual(exported.getvalue(), "".join(tree + "\n" for tree in self.expected))
+
+        # the exported PTB text imports to the same trees
+        export_file = os.path.join(self.directory.name, "export.parsed")
+        with open(export_file, 'w', encoding='utf-8') as outfile:
+            outfile.write(exported.getvalue())
+        self.assertEqual(corpus.read_parsed_file(export_file), self.expected)
+
+    def test_appends_from_two_handles_keep_both_documents(self):
+        first = corpus.Corpus(self.path, "a")
+        second = corpus.Corpus(self.path, "a")
+        first.import_parsed(self.parsed_file, name="first")
+        second.import_parsed(self.parsed_file, name="second")
+        with self.assertRaises(corpus.CorpusError):
+            first.import_parsed(self.parsed_file, name="second")
+        first.close()
+        second.close()
+
+        with corpus.Corpus(self.path) as stored:
+            self.assertEqual([document["name"] for document in stored.documents], ["first", "second"])
+            self.assertEqual(stored.sentence_count, 4)
+            self.assertEqual(list(stored.trees("second")), self.expected)
+
+    def test_append_after_interrupted_import_drops_orphaned_bytes(self):
+        with corpus.Corpus(self.path, "a") as stored:
+            stored.import_parsed(self.parsed_file, name="first")
+        trees_file = os.path.join(self.path, "trees.bin")
+        committed = os.path.getsize(trees_file)
+
+        # an import that wrote trees and index records but never updated corpus.json
+        with open(trees_file, 'ab') as outfile:
+            outfile.write(b"orphaned tree bytes")
+        with open(os.path.join(self.path, "index.bin"), 'ab') as outfile:
+            outfile.write(corpus.recordFormat.pack(1, 1, committed, 19))
+
+        with corpus.Corpus(self.path, "a") as stored:
+            stored.import_parsed(self.parsed_file, name="second")
+            self.assertEqual(stored.record(2)[2], committed)
+            self.assertEqual(list(stored.trees("second")), self.expected)
+        self.assertEqual(os.path.getsize(trees_file), 2 * committed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+Regression tests of the draft-mode heuristics in draftanalyzer.py on hand-tagged sentences and on
+the POS tags of the bundled parse of samples-L2SCA/sample1.txt. They need neither NLTK data nor Java.
+
+To run the tests, type the following at the command line:
+python -m unittest test_draftanalyzer
+"""
+
+import os
+import unittest
+
+import draftanalyzer
+import l2sca
+
+packageDir = os.path.dirname(os.path.abspath(__file__))
+
+#hand-tagged sentences with the clauses, dependent clauses and complex T-units (C, DC, CT) of the full
+#L2SCA analysis; relative clauses before the main verb are common in student writing
+checkSentences = [
+    ("The/DT man/NN who/WP lives/VBZ here/RB is/VBZ nice/JJ ./.", [2, 1, 1]),
+    ("The/DT book/NN that/WDT I/PRP read/VBD was/VBD long/JJ ./.", [2, 1, 1]),
+    ("The/DT students/NNS who/WP finished/VBD early/RB left/VBD ./.", [2, 1, 1]),
+    ("When/WRB it/PRP rains/VBZ ,/, we/PRP stay/VBP inside/RB ./.", [2, 1, 1]),
+    ("I/PRP think/VBP he/PRP left/VBD ./.", [2, 1, 1]),
+    ("She/PRP has/VBZ not/RB been/VBN working/VBG hard/RB ./.", [1, 0, 0]),
+]
+
+
+def read_tagged(text):
+    return [tuple(token.rsplit("/", 1)) for token in text.split()]
+
+
+class EstimateCountsTest(unittest.TestCase):
+
+    def test_clauses_of_check_sentences(self):
+        for text, expected in checkSentences:
+            with self.subTest(sentence=text):
+                counts = draftanalyzer.estimate_counts(read_tagged(text))
+                self.assertEqual([counts[3], counts[5], counts[6]], expected)
+                self.assertEqual(l2sca.is_complex(counts), expected[2] > 0)
+
+    def test_hyphenated_tokens_are_not_words(self):
+        tagged = read_tagged("a/DT well-known/JJ man/NN left/VBD ./.")
+        tree = "(ROOT (S (NP (DT a) (JJ well-known) (NN man)) (VP (VBD left)) (. .)))"
+        self.assertEqual(draftanalyzer.count_words(tagged), 3)
+        self.assertEqual(draftanalyzer.count_words(tagged), l2sca.count_words(tree))
+
+
+class ParseTagsTest(unittest.TestCase):
+
+    def test_sample1_from_parser_tags(self):
+        parsed_file = os.path.join(packageDir, "samples", "testsent.parsed")
+        tagged = draftanalyzer.read_parse_tags(parsed_file)
+        self.assertEqual(len(tagged), 5)
+        self.assertEqual(tagged[0][:3], [("Scores", "NNS"), ("of", "IN"), ("properties", "NNS")])
+
+        reference = draftanalyzer.read_reference(os.path.join(packageDir, "samples-L2SCA", "samples_output"))
+        totals = l2sca.matrix_totals([draftanalyzer.estimate_counts(sentence) for sentence in tagged])
+        # W, S, T, DC, CT and CN agree with the full L2SCA counts; VP, C and CP are still off
+        self.assertEqual(totals, [89, 5, 9, 6, 5, 1, 1, 2, 12])
+        self.assertEqual(reference["sample1.txt"], [89, 5, 11, 7, 5, 1, 1, 1, 12])
+
+
+if __name__ == "__main__":
+    unittest.main()
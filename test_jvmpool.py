@@ -0,0 +1,138 @@
+"""
+Tests of the worker pool in jvmpool.py that run without Java: the pool is given a stub Worker
+class, and the line protocol is checked against small Python processes.
+
+To run the tests, type the following at the command line:
+python -m unittest test_jvmpool
+"""
+
+import sys
+import threading
+import unittest
+from unittest import mock
+
+import jvmpool
+
+
+class StubWorker:
+    """
+    Stands in for jvmpool.Worker: answers every request after a short pause.
+    """
+
+    started = 0
+    live = 0
+    most_live = 0
+    lock = threading.Lock()
+    sizes = []
+
+    def __init__(self, command, startup_timeout=300):
+        with StubWorker.lock:
+            StubWorker.started += 1
+            StubWorker.live += 1
+            StubWorker.most_live = max(StubWorker.most_live, StubWorker.live)
+        self.requests = 0
+        self.heap = 0
+        self.closed = False
+        self.last_used = 0
+
+    def alive(self):
+        return not self.closed
+
+    def request(self, command, lines=(), timeout=120, line_timeout=0):
+        threading.Event().wait(0.05)
+        self.requests += 1
+        StubWorker.sizes.append(len(lines))
+        if command == "MATCH":
+            return [f"{i} 0 {line}" for i, line in enumerate(lines)]
+        return list(lines)
+
+    def ping(self, timeout=10):
+        return True
+
+    def close(self):
+        with StubWorker.lock:
+            if not self.closed:
+                StubWorker.live -= 1
+            self.closed = True
+
+
+def python_worker(script):
+    """
+    Start a Worker whose process runs script instead of the Java worker.
+    """
+    return jvmpool.Worker([sys.executable, "-c", "import sys, time\nprint('READY', flush=True)\n" + script])
+
+
+class WorkerPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        StubWorker.started = StubWorker.live = StubWorker.most_live = 0
+        StubWorker.sizes = []
+        patcher = mock.patch.object(jvmpool, "Worker", StubWorker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_waiting_thread_gets_a_new_worker_when_the_busy_one_is_retired(self):
+        results = []
+        with jvmpool.WorkerPool(size=1, max_requests=1, ping_after=3600) as pool:
+            threads = [threading.Thread(target=lambda i=i: results.append(pool.request("PING", [str(i)])),
+                                        daemon=True) for i in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=10)
+            self.assertFalse(any(thread.is_alive() for thread in threads))
+        self.assertEqual(sorted(results), [["0"], ["1"]])
+        self.assertEqual(StubWorker.started, 2)
+
+    def test_pool_never_starts_more_than_size_workers(self):
+        with jvmpool.WorkerPool(size=2, max_requests=3, ping_after=3600) as pool:
+            threads = [threading.Thread(target=pool.request, args=("PING",), daemon=True) for _ in range(12)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=10)
+            self.assertFalse(any(thread.is_alive() for thread in threads))
+            self.assertEqual(pool.health_check(), 0)
+        self.assertEqual(StubWorker.started, 4)
+        self.assertEqual(StubWorker.most_live, 2)
+
+    def test_long_lists_are_sent_in_chunks(self):
+        sentences = [f"sentence {i}" for i in range(120)]
+        with jvmpool.WorkerPool(chunk_size=50, ping_after=3600) as pool:
+            self.assertEqual(pool.parse(sentences), sentences)
+            self.assertEqual(StubWorker.sizes, [50, 50, 20])
+            matches = pool.match(sentences)
+            self.assertEqual([tree_index for tree_index, _, _ in matches], list(range(120)))
+            self.assertEqual(matches[-1][2], "sentence 119")
+            self.assertEqual(pool.parse([]), [])
+
+
+class WorkerProtocolTest(unittest.TestCase):
+
+    def test_empty_answer_is_a_protocol_error(self):
+        worker = python_worker("sys.stdin.readline()\nprint('', flush=True)\ntime.sleep(60)")
+        with self.assertRaises(jvmpool.WorkerError):
+            worker.request("PING", timeout=10)
+        self.assertFalse(worker.alive())
+
+    def test_deadline_grows_with_the_number_of_lines(self):
+        script = ("header = sys.stdin.readline().split()\n"
+                  "lines = [sys.stdin.readline() for _ in range(int(header[1]))]\n"
+                  "time.sleep(0.2 * len(lines))\n"
+                  "print('OK', len(lines), 0)\n"
+                  "sys.stdout.writelines(lines)\n"
+                  "sys.stdout.flush()\n"
+                  "time.sleep(60)")
+        worker = python_worker(script)
+        self.assertEqual(worker.request("PARSE", ["a b", "c"], timeout=0.1, line_timeout=2), ["a b", "c"])
+        worker.kill()
+
+        worker = python_worker(script)
+        with self.assertRaises(jvmpool.WorkerError):
+            worker.request("PARSE", ["a b", "c"], timeout=0.1)
+        self.assertFalse(worker.alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
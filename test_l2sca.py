@@ -0,0 +1,157 @@
+"""
+Tests of the per-sentence counting helpers in l2sca.py: splitting .parsed files into trees,
+reading the tree numbers printed by tregex -x, building the sentences x 9 matrix, and updating
+the document totals after an edit as watch mode does.
+
+To run the tests, type the following at the command line:
+python -m unittest test_l2sca
+"""
+
+import os
+import random
+import unittest
+from unittest import mock
+
+import l2sca
+
+samplesDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples")
+
+
+def read_groups(filename):
+    with open(os.path.join(samplesDir, filename), 'r', encoding='utf-8') as infile:
+        return l2sca.split_trees(infile.read())
+
+
+class FakeProcess:
+    """
+    Stands in for a Tregex process started by start_tregex_tree_counts.
+    """
+
+    def __init__(self, output):
+        self.output = output
+
+    def communicate(self):
+        return self.output, ""
+
+
+class FakePool:
+    """
+    Stands in for a jvmpool.WorkerPool that counts one match of every pattern in every tree.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = patterns
+
+    def count(self, trees):
+        return [[1] * len(self.patterns) for _ in trees]
+
+
+class SplitTreesTest(unittest.TestCase):
+
+    def test_wsj_0001_groups_and_trees(self):
+        groups = read_groups("wsj_0001.parsed")
+        self.assertEqual(len(groups), 28)
+        self.assertEqual([i for i, group in enumerate(groups) if l2sca.is_parse_tree(group)], [0, 16])
+        self.assertEqual(groups[1], "(Vinken-2, Pierre-1)")
+
+    def test_testsent_groups_and_trees(self):
+        groups = read_groups("testsent.parsed")
+        self.assertEqual(len(groups), 101)
+        self.assertEqual([i for i, group in enumerate(groups) if l2sca.is_parse_tree(group)], [0, 24, 42, 74, 90])
+
+    def test_one_line_trees(self):
+        self.assertTrue(l2sca.is_parse_tree("(ROOT (S (NP (PRP I)) (VP (VBD left)) (. .)))"))
+        self.assertTrue(l2sca.is_parse_tree("( (S (NP (PRP I)) (VP (VBD left))))"))
+        self.assertFalse(l2sca.is_parse_tree("root(ROOT-0, left-2)"))
+
+
+class TreeCountsTest(unittest.TestCase):
+
+    def test_collect_canned_tregex_output(self):
+        output = "Reading trees from file(s) x.parsed\n1:3\n1:9\n17:2\n29:1\nfoo\n\n"
+        counts = l2sca.collect_tregex_tree_counts(FakeProcess(output), 28)
+        self.assertEqual(counts[0], 2)
+        self.assertEqual(counts[16], 1)
+        # matches outside the file's trees and lines that are not tree:node are ignored
+        self.assertEqual(sum(counts), 3)
+
+    def test_tree_counts_matrix(self):
+        trees = ["(ROOT (S (NP (DT a) (JJ well-known) (NN man)) (VP (VBD left))))", "(ROOT (NP (NN dog)))"]
+        counts = [[i + 1, 10 * (i + 1)] for i in range(len(l2sca.patternlist))]
+        matrix = l2sca.tree_counts_matrix(counts, trees)
+        self.assertEqual(matrix[0], [3] + l2sca.combine_counts([row[0] for row in counts]))
+        self.assertEqual(matrix[1], [1] + l2sca.combine_counts([row[1] for row in counts]))
+
+    def test_tree_numbers_skip_typed_dependencies(self):
+        # Tregex numbers the typed dependencies as trees, so the second parse tree is tree 17
+        output = "1:1\n17:1\n17:5\n"
+        parsed_file = os.path.join(samplesDir, "wsj_0001.parsed")
+        with mock.patch.object(l2sca, "start_tregex_tree_counts", lambda pattern, filename: FakeProcess(output)):
+            trees, counts = l2sca.tree_pattern_counts(parsed_file)
+        self.assertEqual(len(trees), 2)
+        self.assertEqual(counts, [[1, 2]] * len(l2sca.patternlist))
+        self.assertEqual(l2sca.matrix_totals(l2sca.tree_counts_matrix(counts, trees))[0], 26)
+
+    def test_pool_with_other_patterns_is_rejected(self):
+        pool = FakePool(l2sca.patternlist[:3])
+        with self.assertRaises(ValueError):
+            l2sca.tree_matrix(["(ROOT (NP (NN dog)))"], pool)
+        pool = FakePool([l2sca.strip_quotes(pattern) for pattern in l2sca.patternlist])
+        self.assertEqual(l2sca.tree_matrix(["(ROOT (NP (NN dog)))"], pool),
+                         [[1] + l2sca.combine_counts([1] * len(l2sca.patternlist))])
+
+
+
+class UpdateTotalsTest(unittest.TestCase):
+
+    def setUp(self):
+        # distinct counts per sentence, so a sentence counted twice or missed shows in the totals
+        self.counts = {sentence: [i + 1] + [(i * 7 + k) % 5 for k in range(8)]
+                       for i, sentence in enumerate("ABCDEFGH")}
+
+    def check(self, previous, sentences):
+        totals = l2sca.matrix_totals([self.counts[sentence] for sentence in previous])
+        expected = l2sca.matrix_totals([self.counts[sentence] for sentence in sentences])
+        self.assertEqual(l2sca.update_totals(totals, previous, sentences, self.counts), expected)
+
+    def test_insert(self):
+        self.check(list("ABC"), list("ADBC"))
+        self.check(list("ABC"), list("ABCE"))
+        self.check([], list("AB"))
+
+    def test_delete(self):
+        self.check(list("ABCD"), list("ACD"))
+        self.check(list("ABCD"), [])
+
+    def test_edit(self):
+        self.check(list("ABCD"), list("ABED"))
+        self.check(list("ABCD"), list("FBCG"))
+
+    def test_duplicate_sentences(self):
+        self.check(list("ABA"), list("AA"))
+        self.check(list("AA"), list("AAA"))
+        self.check(list("AAB"), list("BAA"))
+        self.check(list("ABAB"), list("BB"))
+
+    def test_series_of_random_edits(self):
+        generator = random.Random(0)
+        previous = []
+        totals = l2sca.matrix_totals([])
+        for _ in range(200):
+            sentences = list(previous)
+            for _ in range(generator.randint(1, 3)):
+                position = generator.randint(0, len(sentences))
+                action = generator.choice(["insert", "delete", "edit"])
+                if action == "insert" or not sentences:
+                    sentences.insert(position, generator.choice("ABCDEFGH"))
+                elif action == "delete":
+                    del sentences[min(position, len(sentences) - 1)]
+                else:
+                    sentences[min(position, len(sentences) - 1)] = generator.choice("ABCDEFGH")
+            totals = l2sca.update_totals(totals, previous, sentences, self.counts)
+            self.assertEqual(totals, l2sca.matrix_totals([self.counts[sentence] for sentence in sentences]))
+            previous = sentences
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,256 @@
+import java.io.BufferedReader;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.io.OutputStreamWriter;
+import java.io.PrintWriter;
+import java.io.StringReader;
+import java.lang.management.ManagementFactory;
+import java.lang.management.MemoryPoolMXBean;
+import java.lang.management.MemoryType;
+import java.lang.management.MemoryUsage;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Paths;
+import java.util.ArrayList;
+import java.util.List;
+
+import edu.stanford.nlp.ling.HasWord;
+import edu.stanford.nlp.parser.common.ParserGrammar;
+import edu.stanford.nlp.process.DocumentPreprocessor;
+import edu.stanford.nlp.trees.CollinsHeadFinder;
+import edu.stanford.nlp.trees.Tree;
+import edu.stanford.nlp.trees.TreeReaderFactory;
+import edu.stanford.nlp.trees.tregex.TregexMatcher;
+import edu.stanford.nlp.trees.tregex.TregexParseException;
+import edu.stanford.nlp.trees.tregex.TregexPattern;
+import edu.stanford.nlp.trees.tregex.TregexPatternCompiler;
+
+/**
+ * A long-lived parser and Tregex worker for the L2SCA scripts.
+ *
+ * The parser model and the tregex patterns are loaded once, then requests are read from
+ * stdin and answered on stdout, one line per item, so the JVM start-up and model loading
+ * costs are paid once per worker instead of once per document. See jvmpool.py for the
+ * Python client.
+ *
+ * Usage:
+ * {@code java -cp worker/classes:stanford-parser-full-2020-11-17/* L2SCAWorker
+ *        -patterns patterns.txt [-model model.ser.gz] [-noparser] [parser flags...]}
+ *
+ * Requests (each followed by n lines):
+ * <ul>
+ * <li>{@code PARSE n}: n sentences, one per line; answers one tree per sentence.
+ * <li>{@code PARSETEXT n}: n lines of raw text, split into sentences by the parser's
+ *     tokenizer; answers one tree per sentence found.
+ * <li>{@code COUNT n}: n one-line Penn trees; answers one line of space-separated
+ *     pattern counts per tree, in the order of the pattern file.
+ * <li>{@code MATCH n}: n one-line Penn trees; answers one line per match, counted as in
+ *     {@code COUNT}: the tree index (from 0), the pattern index and the matched subtree.
+ * <li>{@code PING}: answers nothing but the header.
+ * <li>{@code QUIT}: exits.
+ * </ul>
+ *
+ * If a pattern does not compile, the worker prints {@code ERR message} instead of {@code READY}
+ * and exits.
+ *
+ * Every answer starts with {@code OK m heap}, where m is the number of lines that follow and
+ * heap is the number of bytes used on the heap after the last garbage collection, or with
+ * {@code ERR message}.
+ */
+public class L2SCAWorker {
+
+  private static final TreeReaderFactory trf = new TregexPattern.TRegexTreeReaderFactory();
+
+  private final ParserGrammar parser;
+  private final List<TregexPattern> patterns;
+
+  private L2SCAWorker(ParserGrammar parser, List<TregexPattern> patterns) {
+    this.parser = parser;
+    this.patterns = patterns;
+  }
+
+  /** Counts matches the way {@code tregex.sh -C -o} does: each node at most once as the root of a match. */
+  private static int countMatches(TregexPattern pattern, Tree tree) {
+    TregexMatcher matcher = pattern.matcher(tree);
+    Tree lastMatchingRootNode = null;
+    int numMatches = 0;
+    while (matcher.find()) {
+      if (lastMatchingRootNode == matcher.getMatch()) {
+        continue;
+      }
+      lastMatchingRootNode = matcher.getMatch();
+      numMatches++;
+    }
+    return numMatches;
+  }
+
+  private List<String> parse(List<String> sentences) {
+    List<String> trees = new ArrayList<>();
+    for (String sentence : sentences) {
+      trees.add(parser.parse(sentence).toString());
+    }
+    return trees;
+  }
+
+  private List<String> parseText(List<String> lines) {
+    List<String> trees = new ArrayList<>();
+    DocumentPreprocessor preprocessor = new DocumentPreprocessor(new StringReader(String.join("\n", lines)));
+    for (List<? extends HasWord> sentence : preprocessor) {
+      if (parser.getOp().testOptions.preTag) {
+        sentence = parser.loadTagger().apply(sentence);
+      }
+      trees.add(parser.parse(sentence).toString());
+    }
+    return trees;
+  }
+
+  private List<String> count(List<String> trees) {
+    List<String> counts = new ArrayList<>();
+    for (String line : trees) {
+      Tree tree = Tree.valueOf(line, trf);
+      StringBuilder sb = new StringBuilder();
+      for (TregexPattern pattern : patterns) {
+        if (sb.length() > 0) {
+          sb.append(' ');
+        }
+        sb.append(tree == null ? 0 : countMatches(pattern, tree));
+      }
+      counts.add(sb.toString());
+    }
+    return counts;
+  }
+
+  private List<String> match(List<String> trees) {
+    List<String> matches = new ArrayList<>();
+    for (int i = 0; i < trees.size(); i++) {
+      Tree tree = Tree.valueOf(trees.get(i), trf);
+      if (tree == null) {
+        continue;
+      }
+      for (int j = 0; j < patterns.size(); j++) {
+        TregexMatcher matcher = patterns.get(j).matcher(tree);
+        Tree lastMatchingRootNode = null;
+        while (matcher.find()) {
+          if (lastMatchingRootNode == matcher.getMatch()) {
+            continue;
+          }
+          lastMatchingRootNode = matcher.getMatch();
+          matches.add(i + " " + j + ' ' + lastMatchingRootNode.toString());
+        }
+      }
+    }
+    return matches;
+  }
+
+  /**
+   * Heap in use after the most recent garbage collection, summed over the heap pools.
+   * Unlike totalMemory - freeMemory this leaves out garbage that has not been collected
+   * yet, so a late collection does not make the pool recycle a worker.
+   */
+  private static long usedHeap() {
+    long used = 0;
+    for (MemoryPoolMXBean pool : ManagementFactory.getMemoryPoolMXBeans()) {
+      MemoryUsage usage = pool.getCollectionUsage();
+      if (pool.getType() == MemoryType.HEAP && usage != null) {
+        used += usage.getUsed();
+      }
+    }
+    return used;
+  }
+
+  private void serve(BufferedReader in, PrintWriter out) throws IOException {
+    String request;
+    while ((request = in.readLine()) != null) {
+      String[] fields = request.trim().split(" ");
+      String command = fields[0];
+      if (command.equals("QUIT")) {
+        return;
+      }
+      List<String> lines = new ArrayList<>();
+      try {
+        int n = fields.length > 1 ? Integer.parseInt(fields[1]) : 0;
+        for (int i = 0; i < n; i++) {
+          String line = in.readLine();
+          if (line == null) {
+            return;
+          }
+          lines.add(line);
+        }
+        if (parser == null && command.startsWith("PARSE")) {
+          throw new IllegalStateException("worker was started with -noparser");
+        }
+        List<String> answer;
+        switch (command) {
+          case "PING":
+            answer = new ArrayList<>();
+            break;
+          case "PARSE":
+            answer = parse(lines);
+            break;
+          case "PARSETEXT":
+            answer = parseText(lines);
+            break;
+          case "COUNT":
+            answer = count(lines);
+            break;
+          case "MATCH":
+            answer = match(lines);
+            break;
+          default:
+            throw new IllegalArgumentException("unknown request " + command);
+        }
+        out.println("OK " + answer.size() + ' ' + usedHeap());
+        for (String line : answer) {
+          out.println(line);
+        }
+      } catch (RuntimeException e) {
+        out.println("ERR " + String.valueOf(e.getMessage()).replace('\n', ' '));
+      }
+      out.flush();
+    }
+  }
+
+  public static void main(String[] args) throws IOException {
+    String model = "edu/stanford/nlp/models/lexparser/englishPCFG.ser.gz";
+    String patternFile = null;
+    boolean loadParser = true;
+    List<String> flags = new ArrayList<>();
+    for (int i = 0; i < args.length; i++) {
+      if (args[i].equals("-model")) {
+        model = args[++i];
+      } else if (args[i].equals("-patterns")) {
+        patternFile = args[++i];
+      } else if (args[i].equals("-noparser")) {
+        loadParser = false;
+      } else {
+        flags.add(args[i]);
+      }
+    }
+
+    BufferedReader in = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+    PrintWriter out = new PrintWriter(new OutputStreamWriter(System.out, StandardCharsets.UTF_8));
+
+    TregexPatternCompiler compiler = new TregexPatternCompiler(new CollinsHeadFinder());
+    List<TregexPattern> patterns = new ArrayList<>();
+    if (patternFile != null) {
+      for (String line : Files.readAllLines(Paths.get(patternFile), StandardCharsets.UTF_8)) {
+        if ( ! line.trim().isEmpty()) {
+          try {
+            patterns.add(compiler.compile(line.trim()));
+          } catch (TregexParseException e) {
+            // Report the bad pattern instead of READY, so the client can show why the worker did not start
+            out.println("ERR cannot compile pattern " + line.trim() + ": " + String.valueOf(e.getMessage()).replace('\n', ' '));
+            out.flush();
+            return;
+          }
+        }
+      }
+    }
+    ParserGrammar parser = loadParser ? ParserGrammar.loadModel(model, flags.toArray(new String[0])) : null;
+
+    out.println("READY");
+    out.flush();
+    new L2SCAWorker(parser, patterns).serve(in, out);
+  }
+
+}
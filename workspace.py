@@ -0,0 +1,78 @@
+"""
+Per-run scratch workspaces and atomic publishing of outputs.
+
+Every run gets its own private directory for parses, sentence files and LaTeX
+output, so concurrent jobs on the same file name never see each other's files
+and the input directory may be read-only. The directory is removed when the run
+ends, even on errors. Results are copied to their final location under a
+temporary name and renamed into place, so readers never see a half-written file.
+
+The scratch root defaults to the system temporary directory. Set the
+L2SCA_SCRATCH environment variable to choose another one, or to "tmpfs" to use
+/dev/shm when it is available.
+"""
+
+import os
+import shutil
+import tempfile
+
+
+def scratch_root(root=None):
+    """
+    Return the directory in which scratch workspaces are created.
+    """
+    root = root or os.environ.get("L2SCA_SCRATCH")
+    if root == "tmpfs":
+        root = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    return root
+
+
+class Workspace:
+    """
+    A private scratch directory that is deleted when the with-block exits.
+    """
+
+    def __init__(self, prefix="l2sca-", root=None):
+        self.prefix = prefix
+        self.root = scratch_root(root)
+        self.path = None
+
+    def __enter__(self):
+        self.path = tempfile.mkdtemp(prefix=self.prefix, dir=self.root)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
+        return False
+
+    def file(self, name):
+        """
+        Return the path of name inside the workspace.
+        """
+        return os.path.join(self.path, name)
+
+    def cleanup(self):
+        if self.path is not None and os.path.exists(self.path):
+            shutil.rmtree(self.path, ignore_errors=True)
+        self.path = None
+
+
+def publish(source, destination):
+    """
+    Copy source to destination atomically.
+
+    The data is first written to a temporary file in the destination directory and then
+    renamed over destination, so concurrent readers see either the old file or the new one.
+    """
+    destination_dir = os.path.dirname(os.path.abspath(destination))
+    handle, temporary = tempfile.mkstemp(prefix=".publish-", dir=destination_dir)
+    try:
+        with os.fdopen(handle, 'wb') as outfile, open(source, 'rb') as infile:
+            shutil.copyfileobj(infile, outfile)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, destination)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return destination